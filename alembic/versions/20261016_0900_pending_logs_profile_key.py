@@ -0,0 +1,36 @@
+"""pending_logs_profile_key
+
+Revision ID: 20261016_0900_profile_key
+Revises: 3a4b5c6d7e8f
+Create Date: 2026-10-16 09:00:00.000000+00:00
+
+Add kb_profile_key as a stored generated column ("H{heavy}-S{swing}")
+so profile aggregates can select the key instead of formatting it per row.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261016_0900_profile_key'
+down_revision: Union[str, None] = '3a4b5c6d7e8f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('pending_logs', sa.Column(
+        'kb_profile_key', sa.String(16),
+        sa.Computed(
+            "'H' || COALESCE(CAST(kb_heavy_kg_at_time AS VARCHAR), '?')"
+            " || '-S' || COALESCE(CAST(kb_swing_kg_at_time AS VARCHAR), '?')",
+            persisted=True,
+        ),
+    ))
+
+
+def downgrade() -> None:
+    op.drop_column('pending_logs', 'kb_profile_key')
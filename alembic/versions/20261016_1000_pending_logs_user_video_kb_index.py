@@ -0,0 +1,39 @@
+"""pending_logs_user_video_kb_index
+
+Revision ID: 20261016_1000_user_video_kb
+Revises: 20261016_0900_profile_key
+Create Date: 2026-10-16 10:00:00.000000+00:00
+
+Index pending_logs on (user_id, video_id, kb_heavy_kg_at_time,
+kb_swing_kg_at_time), matching the filter + GROUP BY keys of the
+per-profile video aggregates, and index feedback.pending_log_id for the
+per-log RPE subquery those aggregates join.
+
+The feedback index is non-unique on purpose: a log may collect several
+RPE rows (repeat taps, /retry), all of which count toward effort.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20261016_1000_user_video_kb'
+down_revision: Union[str, None] = '20261016_0900_profile_key'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_pending_logs_user_video_kb',
+        'pending_logs',
+        ['user_id', 'video_id', 'kb_heavy_kg_at_time', 'kb_swing_kg_at_time'],
+    )
+    op.create_index('ix_feedback_pending_log', 'feedback', ['pending_log_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_feedback_pending_log', table_name='feedback')
+    op.drop_index('ix_pending_logs_user_video_kb', table_name='pending_logs')
@@ -2,6 +2,7 @@
 
 import logging
 import re
+import time
 import uuid
 from datetime import date, datetime, timedelta, timezone
 from urllib.parse import urlencode
@@ -41,14 +42,13 @@ from whoop_coach.db.models import (
 )
 from whoop_coach.db.session import async_session_factory
 from whoop_coach.matching import MatchCandidate, match_workout
-from whoop_coach.whoop.client import WhoopClient
+from whoop_coach.whoop.client import TokenResponse, WhoopClient
 from whoop_coach.youtube import parse_youtube_url
 from whoop_coach.videos.service import (
-    upsert_video,
+    create_log_with_video,
     get_last_used_video,
     get_last_video_log,
-    get_video_strain_aggregates_by_profile,
-    get_video_effort_aggregates_by_profile,
+    get_video_aggregates_by_profile,
     get_video_overall_aggregates,
     profile_key,
     format_session_metrics,
@@ -58,21 +58,45 @@ from whoop_coach.videos.service import (
 
 import httpx
 
+# Verified access tokens: user_id → (tokens_enc, access_token, expires_at epoch).
+# Keyed on the encrypted blob too, so a reconnect or refresh invalidates it.
+_token_cache: dict[uuid.UUID, tuple[str, str, float]] = {}
+_TOKEN_CACHE_MARGIN_S = 30
+
+
+def _cache_token(user_id: uuid.UUID, tokens_enc: str, token: TokenResponse) -> None:
+    """Remember a working access token until shortly before it expires."""
+    _token_cache[user_id] = (tokens_enc, token.access_token, token.expires_at.timestamp())
+
 
 async def get_whoop_client_with_refresh(
     user_id: uuid.UUID, tokens_enc: str
 ) -> tuple[WhoopClient, bool]:
     """Get WHOOP client, refreshing tokens if needed.
 
+    A cached, not-yet-expiring access token skips decrypt and the
+    get_profile probe entirely.
+
     Returns:
         Tuple of (WhoopClient, tokens_were_refreshed)
     """
+    cached = _token_cache.get(user_id)
+    if (
+        cached
+        and cached[0] == tokens_enc
+        and cached[2] > time.time() + _TOKEN_CACHE_MARGIN_S
+    ):
+        return WhoopClient(access_token=cached[1]), False
+
     tokens = decrypt_tokens(tokens_enc)
     client = WhoopClient(access_token=tokens.get("access_token"))
 
     # Test if token works by making a simple request
     try:
         await client.get_profile()
+        # Expiry is only known for blobs that recorded obtained_at
+        if tokens.get("obtained_at") and tokens.get("refresh_token"):
+            _cache_token(user_id, tokens_enc, TokenResponse.from_dict(tokens))
         return client, False
     except httpx.HTTPStatusError as e:
         print(f"[TOKEN] Initial request failed with status {e.response.status_code}")
@@ -103,7 +127,9 @@ async def get_whoop_client_with_refresh(
         async with session.begin():
             user = await session.get(User, user_id)
             if user:
-                user.whoop_tokens_enc = encrypt_tokens(new_tokens.to_dict())
+                new_tokens_enc = encrypt_tokens(new_tokens.to_dict())
+                user.whoop_tokens_enc = new_tokens_enc
+                _cache_token(user_id, new_tokens_enc, new_tokens)
                 print(f"[TOKEN] New tokens saved for user {user_id}")
 
     return client, True
@@ -548,10 +574,6 @@ async def _process_youtube_url(
                 )
                 return
 
-            # Upsert Video with usage tracking
-            video = await upsert_video(session, video_id)
-            await session.flush()  # Ensure Video exists before FK reference
-
             # Capture KB caps for prompt
             now = datetime.now(timezone.utc)
             should_prompt_kb = (
@@ -559,10 +581,11 @@ async def _process_youtube_url(
                 and kb_weight is None
             )
 
-            # Create PendingLog with KB cap snapshots
-            pending_log = PendingLog(
+            # Upsert Video with usage tracking + PendingLog with KB cap snapshots
+            pending_log = await create_log_with_video(
+                session,
+                video_id,
                 user_id=user.id,
-                video_id=video_id,
                 kb_weight_kg=kb_weight,
                 equipment_profile_at_time=user.equipment_profile,
                 message_timestamp=message_time,
@@ -574,8 +597,6 @@ async def _process_youtube_url(
                 # Set prompt timestamp if we will ask
                 kb_used_prompt_sent_at=now if should_prompt_kb else None,
             )
-            session.add(pending_log)
-            await session.flush()
             log_id = str(pending_log.id)
             user_id = user.id
             equipment = user.equipment_profile
@@ -1454,16 +1475,16 @@ async def tag_last_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     async with async_session_factory() as session:
         async with session.begin():
             user = await get_or_create_user(session, telegram_id)
-            video = await get_last_used_video(session, user.id)
+            last_video = await get_last_used_video(session, user.id)
             
-            if not video:
+            if not last_video:
                 await update.message.reply_text(
                     "🤷 Нет залогированных видео для разметки."
                 )
                 return
             
-            video_id = video.video_id
-            current_tags = set(video.movement_tags) if video.movement_tags else set()
+            video_id, tags = last_video
+            current_tags = set(tags) if tags else set()
 
     await update.message.reply_text(
         f"🏷️ Разметить видео `{video_id}`:\n\n"
@@ -1507,8 +1528,7 @@ async def video_last_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 weights_line = f"Веса (факт): база {heavy_kg} · свинг {swing_kg}  (профиль {current_profile})"
                 
                 # Aggregates
-                strain_aggs = await get_video_strain_aggregates_by_profile(session, user.id, video_id)
-                effort_aggs = await get_video_effort_aggregates_by_profile(session, user.id, video_id)
+                profile_aggs = await get_video_aggregates_by_profile(session, user.id, video_id)
                 overall = await get_video_overall_aggregates(session, user.id, video_id)
 
         tags_str = ", ".join(tags) if tags else "не размечено"
@@ -1531,20 +1551,17 @@ async def video_last_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         ]
         
         # Current profile aggregates
-        strain_by_profile = {(a.heavy_kg, a.swing_kg): a for a in strain_aggs}
-        effort_by_profile = {(a.heavy_kg, a.swing_kg): a for a in effort_aggs}
-        
-        current_strain = strain_by_profile.get((heavy_kg, swing_kg))
-        current_effort = effort_by_profile.get((heavy_kg, swing_kg))
+        by_profile = {(a.heavy_kg, a.swing_kg): a for a in profile_aggs}
+        current = by_profile.get((heavy_kg, swing_kg))
         
         # Always show current profile section
         lines.append(f"\n📊 <b>По профилю {current_profile}</b>")
-        if current_strain or current_effort:
-            if current_strain:
-                lines.append(f"strain: {current_strain.avg_value:.1f} (n={current_strain.count})")
-            if current_effort:
-                word = rpe_mean_to_words(current_effort.avg_value)
-                lines.append(f'effort: {current_effort.avg_value:.1f} — ближе к "{word}" (n={current_effort.count})')
+        if current and (current.strain_count > 0 or current.rpe_count > 0):
+            if current.strain_count > 0:
+                lines.append(f"strain: {current.avg_strain:.1f} (n={current.strain_count})")
+            if current.rpe_count > 0:
+                word = rpe_mean_to_words(current.avg_rpe)
+                lines.append(f'effort: {current.avg_rpe:.1f} — ближе к "{word}" (n={current.rpe_count})')
         else:
             lines.append("нет данных")
         
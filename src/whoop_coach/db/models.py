@@ -9,6 +9,7 @@ from sqlalchemy import (
     BigInteger,
     Boolean,
     CheckConstraint,
+    Computed,
     Date,
     DateTime,
     Enum,
@@ -21,7 +22,7 @@ from sqlalchemy import (
     UniqueConstraint,
     func,
 )
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
 class EquipmentProfile(str, enum.Enum):
@@ -201,6 +202,13 @@ class Video(Base):
     )
 
 
+# Generated-column expression for PendingLog.kb_profile_key
+KB_PROFILE_KEY_SQL = (
+    "'H' || COALESCE(CAST(kb_heavy_kg_at_time AS VARCHAR), '?')"
+    " || '-S' || COALESCE(CAST(kb_swing_kg_at_time AS VARCHAR), '?')"
+)
+
+
 class PendingLog(Base):
     """Pending workout log awaiting match/confirmation.
 
@@ -212,6 +220,10 @@ class PendingLog(Base):
     __table_args__ = (
         Index("ix_pending_logs_user_created", "user_id", "created_at"),
         Index("ix_pending_logs_user_state", "user_id", "state"),
+        Index(
+            "ix_pending_logs_user_video_kb",
+            "user_id", "video_id", "kb_heavy_kg_at_time", "kb_swing_kg_at_time",
+        ),
         CheckConstraint("kb_weight_kg IN (12, 20)", name="ck_pending_logs_kb_weight"),
     )
 
@@ -267,6 +279,11 @@ class PendingLog(Base):
         Integer,
         nullable=True,
     )
+    # Profile key "H{heavy}-S{swing}" ("?" for missing), maintained by the DB
+    kb_profile_key: Mapped[str | None] = mapped_column(
+        String(16),
+        Computed(KB_PROFILE_KEY_SQL, persisted=True),
+    )
     # KB used prompt state
     kb_used_prompt_sent_at: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True),
@@ -317,11 +334,16 @@ class Feedback(Base):
     
     For workout feedback: whoop_workout_id and/or pending_log_id set.
     For morning prompt: is_morning_prompt=True, feedback_date set.
+
+    Workout feedback is many-per-log: every RPE tap (including /retry)
+    inserts a row, so ix_feedback_pending_log is intentionally non-unique
+    and aggregates pre-group feedback per pending_log_id.
     """
 
     __tablename__ = "feedback"
     __table_args__ = (
         Index("ix_feedback_user_created", "user_id", "created_at"),
+        Index("ix_feedback_pending_log", "pending_log_id"),
         CheckConstraint("rpe_1_5 BETWEEN 1 AND 5", name="ck_feedback_rpe"),
         CheckConstraint("soreness_0_3 BETWEEN 0 AND 3", name="ck_feedback_soreness"),
         UniqueConstraint(
@@ -435,6 +457,8 @@ class WebhookEvent(Base):
         nullable=True,
     )
 
+    user: Mapped[User | None] = relationship()
+
 
 class DailyPlan(Base):
     """User's training plan for a day."""
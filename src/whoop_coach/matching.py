@@ -1,11 +1,11 @@
 """Workout matching logic — match pending logs to WHOOP workouts."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MatchCandidate:
     """A candidate WHOOP workout for matching."""
 
@@ -61,22 +61,24 @@ def _parse_whoop_datetime(iso_str: str) -> datetime:
         return datetime.min.replace(tzinfo=timezone.utc)
 
 
+# Common WHOOP sport IDs (partial list)
+_SPORT_NAMES = {
+    0: "Activity",
+    1: "Running",
+    33: "Cycling",
+    43: "Yoga",
+    44: "Pilates",
+    48: "Strength Training",
+    52: "Walking",
+    71: "HIIT",
+    84: "Functional Fitness",
+}
+
+
 def _get_workout_type(workout: dict[str, Any]) -> str:
     """Extract human-readable workout type from WHOOP workout."""
     sport = workout.get("sport_id", 0)
-    # Common WHOOP sport IDs (partial list)
-    sport_names = {
-        0: "Activity",
-        1: "Running",
-        33: "Cycling",
-        43: "Yoga",
-        44: "Pilates",
-        48: "Strength Training",
-        52: "Walking",
-        71: "HIIT",
-        84: "Functional Fitness",
-    }
-    return sport_names.get(sport, f"Sport {sport}")
+    return _SPORT_NAMES.get(sport, f"Sport {sport}")
 
 
 def find_candidates(
@@ -103,14 +105,12 @@ def find_candidates(
     window_start = message_time + window_start_offset
     window_end = message_time + window_end_offset
 
-    candidates = []
-    for w in workouts:
-        candidate = MatchCandidate.from_whoop_workout(w)
-        # Check if workout.end falls in window
-        if window_start <= candidate.end <= window_end:
-            candidates.append(candidate)
-
-    return candidates
+    # Filter on the end timestamp alone; build full candidates only for hits
+    return [
+        MatchCandidate.from_whoop_workout(w)
+        for w in workouts
+        if window_start <= _parse_whoop_datetime(w.get("end", "")) <= window_end
+    ]
 
 
 def score_candidates(
@@ -127,17 +127,16 @@ def score_candidates(
         message_time: UTC-aware timestamp
 
     Returns:
-        Sorted list with scores set (best first).
+        Sorted list of scored copies (best first).
     """
     if message_time.tzinfo is None:
         message_time = message_time.replace(tzinfo=timezone.utc)
 
-    for c in candidates:
-        # Score = seconds from message time (lower is better)
-        delta = abs((c.end - message_time).total_seconds())
-        c.score = delta
-
-    return sorted(candidates, key=lambda c: c.score)
+    # Score = seconds from message time (lower is better); sort (score, index)
+    # pairs so candidates are only copied once, in final order
+    scores = [abs((c.end - message_time).total_seconds()) for c in candidates]
+    order = sorted(range(len(candidates)), key=scores.__getitem__)
+    return [replace(candidates[i], score=scores[i]) for i in order]
 
 
 def match_workout(
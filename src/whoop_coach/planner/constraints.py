@@ -17,6 +17,17 @@ from whoop_coach.planner.options import (
 # Pain locations that block running
 LEG_PAIN_LOCATIONS = {"колено", "икры", "бедро"}
 
+RUN_TYPES = frozenset({WorkoutType.RUN_Z2, WorkoutType.RUN_Z3, WorkoutType.RUN_Z4})
+
+# Equipment unavailable per travel profile
+_BLOCKED_EQUIPMENT = {
+    EquipmentProfile.TRAVEL_BANDS: frozenset({EquipmentRequired.KETTLEBELL}),
+    EquipmentProfile.TRAVEL_NONE: frozenset({
+        EquipmentRequired.KETTLEBELL,
+        EquipmentRequired.BANDS,
+    }),
+}
+
 
 def filter_options(
     all_options: list[WorkoutOption],
@@ -43,70 +54,50 @@ def filter_options(
     Returns:
         Filtered list of allowed workout options
     """
-    allowed = []
     pain_set = set(pain_locations or [])
     has_leg_pain = bool(pain_set & LEG_PAIN_LOCATIONS)
     soreness = soreness or 0
-    
-    for opt in all_options:
-        # === Equipment constraints ===
-        if equipment_profile == EquipmentProfile.TRAVEL_BANDS:
-            # No kettlebell in travel_bands mode
-            if opt.equipment_required == EquipmentRequired.KETTLEBELL:
-                continue
-        elif equipment_profile == EquipmentProfile.TRAVEL_NONE:
-            # No kettlebell or bands in travel_none mode
-            if opt.equipment_required in (
-                EquipmentRequired.KETTLEBELL,
-                EquipmentRequired.BANDS,
-            ):
-                continue
-        
-        # === Pain constraints ===
-        # Leg pain → no running
-        if has_leg_pain:
-            if opt.type in (WorkoutType.RUN_Z2, WorkoutType.RUN_Z3, WorkoutType.RUN_Z4):
-                continue
-        
-        # === Soreness constraints ===
-        if soreness >= 3:
-            # soreness=3 → only mobility/walking/light barre
-            if opt.type in (
-                WorkoutType.RUN_Z2,
-                WorkoutType.RUN_Z3,
-                WorkoutType.RUN_Z4,
-            ):
-                continue
-            # No heavy kettlebell
-            if opt.id == "kb_20":
-                continue
-        
-        if soreness >= 2:
-            # soreness=2 → no Z4
-            if opt.type == WorkoutType.RUN_Z4:
-                continue
-            # Z3 only if no leg pain and recovery not low
-            if opt.type == WorkoutType.RUN_Z3:
-                if has_leg_pain:
-                    continue
-                if recovery_score is not None and recovery_score < 33:
-                    continue
-        
-        # === Z4 limits ===
-        if opt.type == WorkoutType.RUN_Z4:
-            # Max 2 Z4 per 7 days
-            if z4_last_7_days >= 2:
-                continue
-            # At least 48h between Z4
-            if hours_since_last_z4 is not None and hours_since_last_z4 < 48:
-                continue
-            # No Z4 after heavy leg day
-            if had_heavy_leg_yesterday:
-                continue
-        
-        allowed.append(opt)
-    
-    return allowed
+
+    # Every rule depends only on the inputs, not on the option itself, so
+    # resolve them once into blocked equipment/types/ids and filter in one pass.
+    blocked_equipment = _BLOCKED_EQUIPMENT.get(equipment_profile, frozenset())
+    blocked_types: set[WorkoutType] = set()
+    blocked_ids: set[str] = set()
+
+    # === Pain constraints ===
+    # Leg pain → no running
+    if has_leg_pain:
+        blocked_types |= RUN_TYPES
+
+    # === Soreness constraints ===
+    if soreness >= 3:
+        # soreness=3 → only mobility/walking/light barre
+        blocked_types |= RUN_TYPES
+        # No heavy kettlebell
+        blocked_ids.add("kb_20")
+
+    if soreness >= 2:
+        # soreness=2 → no Z4
+        blocked_types.add(WorkoutType.RUN_Z4)
+        # Z3 only if no leg pain and recovery not low
+        if has_leg_pain or (recovery_score is not None and recovery_score < 33):
+            blocked_types.add(WorkoutType.RUN_Z3)
+
+    # === Z4 limits ===
+    if (
+        z4_last_7_days >= 2  # Max 2 Z4 per 7 days
+        or (hours_since_last_z4 is not None and hours_since_last_z4 < 48)  # 48h between Z4
+        or had_heavy_leg_yesterday  # No Z4 after heavy leg day
+    ):
+        blocked_types.add(WorkoutType.RUN_Z4)
+
+    return [
+        opt
+        for opt in all_options
+        if opt.equipment_required not in blocked_equipment
+        and opt.type not in blocked_types
+        and opt.id not in blocked_ids
+    ]
 
 
 def ensure_z3_included(
@@ -117,10 +108,7 @@ def ensure_z3_included(
     
     Per spec: Z3 is the default base run, should always be available if any run is.
     """
-    has_any_run = any(
-        opt.type in (WorkoutType.RUN_Z2, WorkoutType.RUN_Z3, WorkoutType.RUN_Z4)
-        for opt in filtered_options
-    )
+    has_any_run = any(opt.type in RUN_TYPES for opt in filtered_options)
     
     has_z3 = any(opt.type == WorkoutType.RUN_Z3 for opt in filtered_options)
     
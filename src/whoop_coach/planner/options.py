@@ -53,7 +53,7 @@ MODALITY_MAP: dict["WorkoutType", str] = {
 }
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class WorkoutOption:
     """A training option that can be recommended."""
     
@@ -220,12 +220,13 @@ ALL_OPTIONS: list[WorkoutOption] = [
 ]
 
 
+# Id lookup over the catalog (built once at import)
+_OPTIONS_BY_ID: dict[str, WorkoutOption] = {o.id: o for o in ALL_OPTIONS}
+
+
 def get_option_by_id(option_id: str) -> WorkoutOption | None:
     """Get workout option by ID."""
-    for opt in ALL_OPTIONS:
-        if opt.id == option_id:
-            return opt
-    return None
+    return _OPTIONS_BY_ID.get(option_id)
 
 
 def get_modality(opt: WorkoutOption) -> str:
@@ -49,9 +49,9 @@ RECOVERY_HIGH_THRESHOLD = 85
 EASY_TYPES = {WorkoutType.MOBILITY, WorkoutType.WALKING, WorkoutType.RUN_Z2}
 
 
-@dataclass
+@dataclass(frozen=True)
 class ScoringContext:
-    """Context for soft scoring rules."""
+    """Context for soft scoring rules (immutable, hashable)."""
     
     recovery_score: int = 50
     soreness: int = 0
@@ -280,20 +280,18 @@ def score_options(
     Returns:
         Sorted list of scored options (best first)
     """
+    soreness = soreness if soreness is not None else 0
     ctx = ScoringContext(
         recovery_score=recovery_score if recovery_score is not None else 50,
-        soreness=soreness if soreness is not None else 0,
+        soreness=soreness,
         # These are filled in by generator when using full context
         recent_heavy_count_3d=0,
-        last_leg_doms_high=False,
+        # Convert high soreness to leg doms flag for backward compatibility
+        last_leg_doms_high=soreness >= 3,
         last_modality=None,
         last_two_modalities=None,
     )
     
-    # Convert high soreness to leg doms flag for backward compatibility
-    if ctx.soreness >= 3:
-        ctx.last_leg_doms_high = True
-    
     return score_options_v2(options, ctx)
 
 
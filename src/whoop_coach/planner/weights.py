@@ -6,7 +6,7 @@ Assigns kettlebell weights based on video movement tags and user capabilities.
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class UserKbCaps:
     """User's kettlebell capabilities."""
     
@@ -16,10 +16,20 @@ class UserKbCaps:
 
 
 # Movement tags that use heavy weight
-HEAVY_TAGS = {"pull", "squat", "carry"}
+HEAVY_TAGS = frozenset({"pull", "squat", "carry"})
 
+# tag → (output key, UserKbCaps field): one dict lookup per tag.
+# Heavy entries come from HEAVY_TAGS so the two can't drift apart.
+_TAG_TO_FIELD = {
+    "overhead": ("overhead_kg", "kb_overhead_max_kg"),
+    "swing": ("swing_kg", "kb_swing_kg"),
+    **{tag: ("heavy_kg", "kb_heavy_kg") for tag in HEAVY_TAGS},
+}
 
-def assign_kb_weights(movement_tags: list[str], user_kb: UserKbCaps) -> dict[str, int]:
+
+def assign_kb_weights(
+    movement_tags: list[str] | None, user_kb: UserKbCaps
+) -> dict[str, int]:
     """Assign KB weights based on movement tags and user capabilities.
     
     Rules:
@@ -28,7 +38,7 @@ def assign_kb_weights(movement_tags: list[str], user_kb: UserKbCaps) -> dict[str
     - pull/squat/carry → user.kb_heavy_kg (default 20)
     
     Args:
-        movement_tags: List of movement pattern tags from video
+        movement_tags: List of movement pattern tags from video (None if untagged)
         user_kb: User's KB capability settings
         
     Returns:
@@ -37,21 +47,25 @@ def assign_kb_weights(movement_tags: list[str], user_kb: UserKbCaps) -> dict[str
     if not movement_tags:
         return {}
     
-    tags_set = set(t.lower() for t in movement_tags)
     weights: dict[str, int] = {}
     
-    if "overhead" in tags_set:
-        weights["overhead_kg"] = user_kb.kb_overhead_max_kg
-    
-    if "swing" in tags_set:
-        weights["swing_kg"] = user_kb.kb_swing_kg
-    
-    if tags_set & HEAVY_TAGS:
-        weights["heavy_kg"] = user_kb.kb_heavy_kg
+    for tag in movement_tags:
+        target = _TAG_TO_FIELD.get(tag.lower())
+        if target is not None:
+            out_key, field = target
+            weights[out_key] = getattr(user_kb, field)
     
     return weights
 
 
+# Display order and label template for each weight key
+_KB_FMT = (
+    ("overhead_kg", "над головой {} кг"),
+    ("swing_kg", "свинг {} кг"),
+    ("heavy_kg", "тяга/присед/переноски {} кг"),
+)
+
+
 def format_kb_weights_ru(weights: dict[str, int]) -> str:
     """Format weights as compact Russian string.
     
@@ -63,15 +77,6 @@ def format_kb_weights_ru(weights: dict[str, int]) -> str:
     Returns:
         Formatted string, empty if no weights
     """
-    parts = []
-    
-    if "overhead_kg" in weights:
-        parts.append(f"над головой {weights['overhead_kg']} кг")
-    
-    if "swing_kg" in weights:
-        parts.append(f"свинг {weights['swing_kg']} кг")
-    
-    if "heavy_kg" in weights:
-        parts.append(f"тяга/присед/переноски {weights['heavy_kg']} кг")
-    
-    return "; ".join(parts)
+    return "; ".join(
+        template.format(weights[key]) for key, template in _KB_FMT if key in weights
+    )
@@ -1,51 +1,107 @@
-"""Video service: upsert, usage tracking, last used queries, aggregates."""
+"""Video service: usage tracking, last used queries, aggregates."""
 
+import re
+from bisect import bisect_right
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from datetime import UTC, datetime
+from functools import lru_cache
 from uuid import UUID
 
-from sqlalchemy import func, select
+from sqlalchemy import Float, bindparam, cast, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from whoop_coach.db.models import Feedback, PendingLog, User, Video
 
+# Single-pass translation table for Telegram HTML parse mode
+_HTML_ESCAPE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#39;",
+})
+# Most titles/tags have nothing to escape: a C-level scan lets us skip translate()
+_HTML_SPECIAL_RE = re.compile(r"[&<>\"']")
+
+# RPE mean buckets: value < break[i] → label[i], otherwise the last label
+_RPE_BREAKS = (1.5, 2.5, 3.5, 4.5)
+_RPE_LABELS = (
+    "Сделал разминку",
+    "Мог бы сделать ещё одну",
+    "Хватит на сегодня",
+    "Еле дожал",
+    "Меня вынесло",
+)
+
 
 def canonicalize_youtube_url(video_id: str) -> str:
     """Return canonical YouTube URL for a video ID."""
     return f"https://www.youtube.com/watch?v={video_id}"
 
 
-async def upsert_video(session: AsyncSession, video_id: str) -> Video:
-    """Upsert video: increment usage if exists, create if new.
-    
+async def create_log_with_video(
+    session: AsyncSession, video_id: str, **log_fields
+) -> PendingLog:
+    """Upsert video usage and insert its PendingLog in one flush sequence.
+
+    The video is upserted with a single INSERT ... ON CONFLICT DO UPDATE
+    (no SELECT round-trip), then the log is flushed right after it.
+
     Args:
         session: Database session (must be in transaction)
         video_id: YouTube video ID (11 chars)
-    
+        **log_fields: Remaining PendingLog columns
+
     Returns:
-        Video instance (new or updated)
+        Flushed PendingLog instance (id populated)
     """
-    video = await session.get(Video, video_id)
-    now = datetime.now(timezone.utc)
-    
-    if video:
-        video.usage_count += 1
-        video.last_used_at = now
-    else:
-        video = Video(
-            video_id=video_id,
-            usage_count=1,
-            first_seen_at=now,
-            last_used_at=now,
-        )
-        session.add(video)
-    
-    return video
+    now = datetime.now(UTC)
+    dialect = session.get_bind().dialect.name
+    insert = pg_insert if dialect == "postgresql" else sqlite_insert
+
+    stmt = insert(Video).values(
+        video_id=video_id,
+        usage_count=1,
+        first_seen_at=now,
+        last_used_at=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Video.video_id],
+        set_={
+            "usage_count": Video.usage_count + 1,
+            "last_used_at": stmt.excluded.last_used_at,
+        },
+    )
+    await session.execute(stmt)
+
+    pending_log = PendingLog(video_id=video_id, **log_fields)
+    session.add(pending_log)
+    await session.flush()
+    return pending_log
 
 
-async def get_last_used_video(session: AsyncSession, user_id: UUID) -> Video | None:
+_LAST_USED_VIDEO_STMT = (
+    select(Video.video_id, Video.movement_tags)
+    .join(PendingLog, PendingLog.video_id == Video.video_id)
+    .where(
+        PendingLog.user_id == bindparam("user_id"),
+        PendingLog.video_id.isnot(None),
+    )
+    .order_by(PendingLog.created_at.desc())
+    .limit(1)
+)
+
+
+async def get_last_used_video(
+    session: AsyncSession, user_id: UUID
+) -> tuple[str, list[str]] | None:
     """Get most recently used video for a user.
     
+    Only video_id and movement_tags are projected, so no Video instance
+    is loaded into the session.
+
     Query: pending_logs JOIN videos
     WHERE pending_logs.user_id = ? AND pending_logs.video_id IS NOT NULL
     ORDER BY pending_logs.created_at DESC
@@ -56,20 +112,11 @@ async def get_last_used_video(session: AsyncSession, user_id: UUID) -> Video | N
         user_id: User's UUID
     
     Returns:
-        Video instance or None if no videos logged
+        (video_id, movement_tags) or None if no videos logged
     """
-    stmt = (
-        select(Video)
-        .join(PendingLog, PendingLog.video_id == Video.video_id)
-        .where(
-            PendingLog.user_id == user_id,
-            PendingLog.video_id.isnot(None),
-        )
-        .order_by(PendingLog.created_at.desc())
-        .limit(1)
-    )
-    result = await session.execute(stmt)
-    return result.scalar_one_or_none()
+    result = await session.execute(_LAST_USED_VIDEO_STMT, {"user_id": user_id})
+    row = result.first()
+    return (row[0], row[1]) if row else None
 
 
 # === New functions for /video_last with profile aggregates ===
@@ -78,104 +125,125 @@ async def get_last_used_video(session: AsyncSession, user_id: UUID) -> Video | N
 # PendingLog.video_id is a string FK referencing Video.video_id.
 
 
+_LAST_VIDEO_LOG_STMT = (
+    select(Video, PendingLog)
+    .select_from(PendingLog)
+    .join(Video, Video.video_id == PendingLog.video_id)
+    .where(
+        PendingLog.user_id == bindparam("user_id"),
+        PendingLog.video_id.isnot(None),
+    )
+    .order_by(PendingLog.created_at.desc())
+    .limit(1)
+)
+
+
 async def get_last_video_log(
     session: AsyncSession, user_id: UUID
 ) -> tuple[Video, PendingLog] | None:
-    """Get most recent video and its PendingLog for a user."""
-    stmt = (
-        select(Video, PendingLog)
-        .join(PendingLog, PendingLog.video_id == Video.video_id)
-        .where(
-            PendingLog.user_id == user_id,
-            PendingLog.video_id.isnot(None),
-        )
-        .order_by(PendingLog.created_at.desc())
-        .limit(1)
-    )
-    result = await session.execute(stmt)
+    """Get most recent video and its PendingLog for a user.
+
+    PendingLog drives the query: ORDER BY created_at DESC LIMIT 1 is served
+    by a backward scan of ix_pending_logs_user_created (user_id, created_at),
+    then the video is a primary-key lookup.
+    """
+    result = await session.execute(_LAST_VIDEO_LOG_STMT, {"user_id": user_id})
     row = result.first()
     return (row[0], row[1]) if row else None
 
 
-@dataclass
-class ProfileAggregate:
-    """Aggregate stats for a KB weight profile."""
+@dataclass(slots=True, frozen=True)
+class ProfileAggregates:
+    """Strain and effort aggregates for a KB weight profile."""
     heavy_kg: int
     swing_kg: int
-    avg_value: float
-    count: int
-
-    @property
-    def profile_key(self) -> str:
-        return f"H{self.heavy_kg}-S{self.swing_kg}"
+    profile_key: str  # Read from pending_logs.kb_profile_key
+    avg_strain: float | None
+    strain_count: int
+    avg_rpe: float | None
+    rpe_count: int
 
 
-async def get_video_strain_aggregates_by_profile(
-    session: AsyncSession, user_id: UUID, video_id: str
-) -> list[ProfileAggregate]:
-    """Get avg strain per KB profile for a video.
-    
-    Excludes rows where kb_heavy_kg_at_time or kb_swing_kg_at_time is NULL.
-    Results ordered by count descending (most frequent profile first).
-    """
-    stmt = (
-        select(
-            PendingLog.kb_heavy_kg_at_time,
-            PendingLog.kb_swing_kg_at_time,
-            func.avg(PendingLog.whoop_strain),
-            func.count(),
-        )
-        .where(
-            PendingLog.user_id == user_id,
-            PendingLog.video_id == video_id,
-            PendingLog.whoop_strain.isnot(None),
-            PendingLog.kb_heavy_kg_at_time.isnot(None),
-            PendingLog.kb_swing_kg_at_time.isnot(None),
-        )
-        .group_by(PendingLog.kb_heavy_kg_at_time, PendingLog.kb_swing_kg_at_time)
-        .order_by(func.count().desc())
+# RPE pre-aggregated per log: a log may collect several Feedback rows
+# (repeat RPE taps, /retry), so joining Feedback directly would repeat the
+# log's strain once per feedback. One row per log keeps strain counted once.
+_RPE_PER_LOG = (
+    select(
+        Feedback.pending_log_id,
+        func.sum(Feedback.rpe_1_5).label("rpe_sum"),
+        func.count(Feedback.rpe_1_5).label("rpe_count"),
     )
-    result = await session.execute(stmt)
-    return [
-        ProfileAggregate(heavy_kg=row[0], swing_kg=row[1], avg_value=row[2], count=row[3])
-        for row in result.all()
-    ]
+    .where(Feedback.pending_log_id.isnot(None))
+    .group_by(Feedback.pending_log_id)
+    .subquery()
+)
+# Mean over every RPE value (not a mean of per-log means); NULL when none
+_AVG_RPE = cast(func.sum(_RPE_PER_LOG.c.rpe_sum), Float) / func.nullif(
+    func.sum(_RPE_PER_LOG.c.rpe_count), 0
+)
+_RPE_COUNT = func.coalesce(func.sum(_RPE_PER_LOG.c.rpe_count), 0)
+
+_BY_PROFILE_STMT = (
+    select(
+        PendingLog.kb_heavy_kg_at_time,
+        PendingLog.kb_swing_kg_at_time,
+        PendingLog.kb_profile_key,
+        func.avg(PendingLog.whoop_strain),
+        func.count(PendingLog.whoop_strain),
+        _AVG_RPE,
+        _RPE_COUNT,
+    )
+    .select_from(PendingLog)
+    .outerjoin(_RPE_PER_LOG, _RPE_PER_LOG.c.pending_log_id == PendingLog.id)
+    .where(
+        PendingLog.user_id == bindparam("user_id"),
+        PendingLog.video_id == bindparam("video_id"),
+        PendingLog.kb_heavy_kg_at_time.isnot(None),
+        PendingLog.kb_swing_kg_at_time.isnot(None),
+    )
+    .group_by(
+        PendingLog.kb_heavy_kg_at_time,
+        PendingLog.kb_swing_kg_at_time,
+        PendingLog.kb_profile_key,
+    )
+    # Profiles with neither strain nor RPE render as "нет данных" anyway
+    .having(or_(func.count(PendingLog.whoop_strain) > 0, _RPE_COUNT > 0))
+    .order_by(func.count(PendingLog.id).desc())
+)
 
 
-async def get_video_effort_aggregates_by_profile(
+async def get_video_aggregates_by_profile(
     session: AsyncSession, user_id: UUID, video_id: str
-) -> list[ProfileAggregate]:
-    """Get avg effort (RPE) per KB profile for a video.
-    
-    Excludes rows where kb_heavy_kg_at_time or kb_swing_kg_at_time is NULL.
-    Results ordered by count descending (most frequent profile first).
+) -> list[ProfileAggregates]:
+    """Get avg strain and avg effort (RPE) per KB profile for a video.
+
+    Both are aggregated in one GROUP BY pass: RPE is pre-aggregated per log
+    and outer-joined, so strain is counted once per log however many
+    Feedback rows it has. avg/count skip NULL strain and RPE values.
+    Excludes rows where kb_heavy_kg_at_time or kb_swing_kg_at_time is NULL,
+    and profiles with no strain and no RPE at all.
+    Results ordered by log count descending (most frequent profile first).
+    Not capped: the caller looks up the current profile, which is often the
+    newest and least used one.
     """
-    stmt = (
-        select(
-            PendingLog.kb_heavy_kg_at_time,
-            PendingLog.kb_swing_kg_at_time,
-            func.avg(Feedback.rpe_1_5),
-            func.count(),
-        )
-        .join(Feedback, Feedback.pending_log_id == PendingLog.id)
-        .where(
-            PendingLog.user_id == user_id,
-            PendingLog.video_id == video_id,
-            Feedback.rpe_1_5.isnot(None),
-            PendingLog.kb_heavy_kg_at_time.isnot(None),
-            PendingLog.kb_swing_kg_at_time.isnot(None),
-        )
-        .group_by(PendingLog.kb_heavy_kg_at_time, PendingLog.kb_swing_kg_at_time)
-        .order_by(func.count().desc())
+    result = await session.execute(
+        _BY_PROFILE_STMT, {"user_id": user_id, "video_id": video_id}
     )
-    result = await session.execute(stmt)
     return [
-        ProfileAggregate(heavy_kg=row[0], swing_kg=row[1], avg_value=row[2], count=row[3])
-        for row in result.all()
+        ProfileAggregates(
+            heavy_kg=heavy_kg,
+            swing_kg=swing_kg,
+            profile_key=key,
+            avg_strain=avg_strain,
+            strain_count=strain_count,
+            avg_rpe=avg_rpe,
+            rpe_count=rpe_count,
+        )
+        for heavy_kg, swing_kg, key, avg_strain, strain_count, avg_rpe, rpe_count in result.all()
     ]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class OverallAggregates:
     """Overall aggregates for a video (no profile grouping)."""
     avg_strain: float | None
@@ -184,51 +252,75 @@ class OverallAggregates:
     rpe_count: int
 
 
-async def get_video_overall_aggregates(
-    session: AsyncSession, user_id: UUID, video_id: str
-) -> OverallAggregates:
-    """Get overall aggregates (no profile grouping) for a video."""
-    # Strain (include all rows, even with NULL profile)
-    strain_stmt = select(
+_OVERALL_BY_VIDEO_STMT = (
+    select(
+        PendingLog.video_id,
         func.avg(PendingLog.whoop_strain),
-        func.count(),
-    ).where(
-        PendingLog.user_id == user_id,
-        PendingLog.video_id == video_id,
-        PendingLog.whoop_strain.isnot(None),
+        func.count(PendingLog.whoop_strain),
+        _AVG_RPE,
+        _RPE_COUNT,
     )
-    strain_result = await session.execute(strain_stmt)
-    strain_row = strain_result.first()
-
-    # RPE (include all rows)
-    rpe_stmt = (
-        select(func.avg(Feedback.rpe_1_5), func.count())
-        .select_from(PendingLog)
-        .join(Feedback, Feedback.pending_log_id == PendingLog.id)
-        .where(
-            PendingLog.user_id == user_id,
-            PendingLog.video_id == video_id,
-            Feedback.rpe_1_5.isnot(None),
-        )
+    .select_from(PendingLog)
+    .outerjoin(_RPE_PER_LOG, _RPE_PER_LOG.c.pending_log_id == PendingLog.id)
+    .where(
+        PendingLog.user_id == bindparam("user_id"),
+        PendingLog.video_id.in_(bindparam("video_ids", expanding=True)),
     )
-    rpe_result = await session.execute(rpe_stmt)
-    rpe_row = rpe_result.first()
-
-    return OverallAggregates(
-        avg_strain=strain_row[0] if strain_row else None,
-        strain_count=strain_row[1] if strain_row else 0,
-        avg_rpe=rpe_row[0] if rpe_row else None,
-        rpe_count=rpe_row[1] if rpe_row else 0,
+    .group_by(PendingLog.video_id)
+)
+
+
+async def get_videos_overall_aggregates(
+    session: AsyncSession, user_id: UUID, video_ids: list[str]
+) -> dict[str, OverallAggregates]:
+    """Get overall aggregates for several videos in one query.
+
+    Strain and RPE are aggregated in a single GROUP BY video_id pass.
+    A log may have several RPE feedbacks; they are pre-aggregated per log,
+    so each one counts towards RPE while the log's strain counts once.
+    Videos without logs get zero counts.
+    """
+    if not video_ids:
+        return {}
+
+    result = await session.execute(
+        _OVERALL_BY_VIDEO_STMT, {"user_id": user_id, "video_ids": list(video_ids)}
     )
 
+    aggregates = {
+        video_id: OverallAggregates(avg_strain=None, strain_count=0, avg_rpe=None, rpe_count=0)
+        for video_id in video_ids
+    }
+    for video_id, avg_strain, strain_count, avg_rpe, rpe_count in result.all():
+        aggregates[video_id] = OverallAggregates(
+            avg_strain=avg_strain,
+            strain_count=strain_count,
+            avg_rpe=avg_rpe,
+            rpe_count=rpe_count,
+        )
+    return aggregates
+
+
+async def get_video_overall_aggregates(
+    session: AsyncSession, user_id: UUID, video_id: str
+) -> OverallAggregates:
+    """Get overall aggregates (no profile grouping) for a video."""
+    aggregates = await get_videos_overall_aggregates(session, user_id, [video_id])
+    return aggregates[video_id]
+
 
 # === Helper functions ===
 
+_SESSION_PREFIX = "Последняя сессия: "
+_SESSION_MATCHED_NO_METRICS = _SESSION_PREFIX + "смэтчилось, но метрик нет"
+_SESSION_NOT_MATCHED = _SESSION_PREFIX + "WHOOP не смэтчилось (пока) — /retry"
+
 
+@lru_cache(maxsize=64)
 def profile_key(heavy: int | None, swing: int | None) -> str:
-    """Format KB weight profile key."""
-    h = heavy if heavy else "?"
-    s = swing if swing else "?"
+    """Format KB weight profile key (same rendering as pending_logs.kb_profile_key)."""
+    h = "?" if heavy is None else heavy
+    s = "?" if swing is None else swing
     return f"H{h}-S{s}"
 
 
@@ -240,55 +332,55 @@ def format_session_metrics(log: PendingLog) -> str:
     - If whoop_workout_id is NOT set → "не смэтчилось — /retry"
     - Otherwise → show available metrics
     """
-    # Check if match happened
-    match_happened = log.whoop_workout_id is not None or log.matched_at is not None
-    
+    return _format_session_metrics(
+        log.whoop_strain,
+        log.whoop_duration_s,
+        log.whoop_hr_avg,
+        log.whoop_hr_max,
+        log.whoop_workout_type,
+        log.whoop_workout_id is not None or log.matched_at is not None,
+    )
+
+
+@lru_cache(maxsize=2048)
+def _format_session_metrics(
+    strain: float | None,
+    duration_s: int | None,
+    hr_avg: int | None,
+    hr_max: int | None,
+    workout_type: str | None,
+    matched: bool,
+) -> str:
+    """Render the session line from plain values (cached; keyed by value, not by log)."""
     parts = []
     
-    if log.whoop_strain is not None:
-        parts.append(f"strain {log.whoop_strain:.1f}")
+    if strain is not None:
+        parts.append(f"strain {strain:.1f}")
     
-    if log.whoop_duration_s is not None:
-        mins = log.whoop_duration_s // 60
-        parts.append(f"{mins} мин")
+    if duration_s is not None:
+        parts.append(f"{duration_s // 60} мин")
     
-    if log.whoop_hr_avg is not None or log.whoop_hr_max is not None:
-        hr_avg = log.whoop_hr_avg or "?"
-        hr_max = log.whoop_hr_max or "?"
-        parts.append(f"HR {hr_avg}/{hr_max}")
+    if hr_avg is not None or hr_max is not None:
+        parts.append(f"HR {hr_avg or '?'}/{hr_max or '?'}")
     
-    if log.whoop_workout_type:
-        parts.append(log.whoop_workout_type)
+    if workout_type:
+        parts.append(workout_type)
     
     if parts:
-        return "Последняя сессия: " + " · ".join(parts)
-    elif match_happened:
-        return "Последняя сессия: смэтчилось, но метрик нет"
+        return _SESSION_PREFIX + " · ".join(parts)
+    elif matched:
+        return _SESSION_MATCHED_NO_METRICS
     else:
-        return "Последняя сессия: WHOOP не смэтчилось (пока) — /retry"
+        return _SESSION_NOT_MATCHED
 
 
 def rpe_mean_to_words(mean: float) -> str:
     """Convert RPE mean to Variant C masculine words."""
-    if mean < 1.5:
-        return "Сделал разминку"
-    elif mean < 2.5:
-        return "Мог бы сделать ещё одну"
-    elif mean < 3.5:
-        return "Хватит на сегодня"
-    elif mean < 4.5:
-        return "Еле дожал"
-    else:
-        return "Меня вынесло"
+    return _RPE_LABELS[bisect_right(_RPE_BREAKS, mean)]
 
 
 def escape_html(text: str) -> str:
     """Escape HTML special characters for Telegram HTML parse mode."""
-    return (
-        text
-        .replace("&", "&amp;")
-        .replace("<", "&lt;")
-        .replace(">", "&gt;")
-        .replace('"', "&quot;")
-        .replace("'", "&#39;")
-    )
+    if _HTML_SPECIAL_RE.search(text) is None:
+        return text
+    return text.translate(_HTML_ESCAPE)
@@ -4,6 +4,9 @@ import logging
 import uuid
 from datetime import UTC, datetime
 
+from sqlalchemy import select, update
+from sqlalchemy.orm import joinedload
+
 from whoop_coach.bot.handlers import get_whoop_client_with_refresh
 from whoop_coach.db.models import WebhookEvent, WebhookEventStatus
 from whoop_coach.db.session import async_session_factory
@@ -16,30 +19,37 @@ async def process_recovery_webhook(event_id: uuid.UUID, app) -> None:
     
     Called from routes.py via BackgroundTasks.
     """
-    print(f"[WEBHOOK] process_recovery_webhook started, event_id={event_id}")
+    logger.debug("[WEBHOOK] process_recovery_webhook started, event_id=%s", event_id)
     
     async with async_session_factory() as session:
-        event = await session.get(WebhookEvent, event_id)
+        # Event + user in a single round-trip
+        result = await session.execute(
+            select(WebhookEvent)
+            .options(joinedload(WebhookEvent.user))
+            .where(WebhookEvent.id == event_id)
+        )
+        event = result.scalar_one_or_none()
         if not event:
-            print(f"[WEBHOOK] Event not found: {event_id}")
+            logger.warning("[WEBHOOK] Event not found: %s", event_id)
             return
         
-        print(f"[WEBHOOK] Processing event: sleep_id={event.sleep_id}, user_id={event.user_id}")
+        logger.debug(
+            "[WEBHOOK] Processing event: sleep_id=%s, user_id=%s", event.sleep_id, event.user_id
+        )
+        # PROCESSING is kept in memory only: every exit path below commits
+        # exactly once with its terminal status.
         event.status = WebhookEventStatus.PROCESSING
-        await session.commit()
         
         try:
-            # Import User here to avoid circular imports
-            from whoop_coach.db.models import User
-            user = await session.get(User, event.user_id)
+            user = event.user
             if not user or not user.whoop_tokens_enc:
-                print(f"[WEBHOOK] User not found or no tokens: user_id={event.user_id}")
+                logger.warning("[WEBHOOK] User not found or no tokens: user_id=%s", event.user_id)
                 event.status = WebhookEventStatus.FAILED
                 event.error_message = "User not found or no tokens"
                 await session.commit()
                 return
             
-            print(f"[WEBHOOK] User found: telegram_id={user.telegram_id}")
+            logger.debug("[WEBHOOK] User found: telegram_id=%s", user.telegram_id)
             
             # Get WHOOP client with token refresh
             client, tokens_refreshed = await get_whoop_client_with_refresh(
@@ -51,10 +61,12 @@ async def process_recovery_webhook(event_id: uuid.UUID, app) -> None:
                 sleep = await client.get_sleep(event.sleep_id)
                 cycle_id = sleep.get("cycle_id")
                 tz_offset = sleep.get("timezone_offset", "+01:00")
-                print(f"[WEBHOOK] Sleep data: cycle_id={cycle_id}, tz_offset={tz_offset}")
+                logger.debug("[WEBHOOK] Sleep data: cycle_id=%s, tz_offset=%s", cycle_id, tz_offset)
                 
                 if not cycle_id:
-                    print("[WEBHOOK] No cycle_id in sleep data!")
+                    logger.warning(
+                        "[WEBHOOK] No cycle_id in sleep data, sleep_id=%s", event.sleep_id
+                    )
                     event.status = WebhookEventStatus.FAILED
                     event.error_message = "No cycle_id in sleep data"
                     await session.commit()
@@ -63,17 +75,17 @@ async def process_recovery_webhook(event_id: uuid.UUID, app) -> None:
                 # 2. Recovery for cycle
                 recovery = await client.get_recovery(cycle_id)
                 if not recovery:
-                    print(f"[WEBHOOK] No recovery data for cycle_id={cycle_id}")
+                    logger.info("[WEBHOOK] No recovery data for cycle_id=%s", cycle_id)
                     event.status = WebhookEventStatus.PENDING_SCORE
                     await session.commit()
                     return
                 
                 score_state = recovery.get("score_state", "")
-                print(f"[WEBHOOK] Recovery score_state={score_state}")
+                logger.debug("[WEBHOOK] Recovery score_state=%s", score_state)
                 
                 if score_state != "SCORED":
                     # Recovery not ready yet, wait for next webhook
-                    print("[WEBHOOK] Recovery not scored yet, waiting...")
+                    logger.info("[WEBHOOK] Recovery not scored yet, waiting...")
                     event.status = WebhookEventStatus.PENDING_SCORE
                     await session.commit()
                     return
@@ -81,7 +93,7 @@ async def process_recovery_webhook(event_id: uuid.UUID, app) -> None:
                 # 3. Check if morning feedback needed first
                 from whoop_coach.bot.handlers import _needs_morning_prompt
                 needs_feedback = await _needs_morning_prompt(session, user.id)
-                print(f"[WEBHOOK] needs_morning_prompt={needs_feedback}")
+                logger.debug("[WEBHOOK] needs_morning_prompt=%s", needs_feedback)
                 
                 if needs_feedback:
                     # Send morning questions first
@@ -91,7 +103,9 @@ async def process_recovery_webhook(event_id: uuid.UUID, app) -> None:
                     bot = app.state.tg_app.bot
                     today_str = _get_berlin_date().isoformat()
                     
-                    print(f"[WEBHOOK] Sending morning prompt to telegram_id={user.telegram_id}")
+                    logger.debug(
+                        "[WEBHOOK] Sending morning prompt to telegram_id=%s", user.telegram_id
+                    )
                     await bot.send_message(
                         chat_id=user.telegram_id,
                         text="☀️ Доброе утро! Как ощущения после вчерашнего дня?",
@@ -100,7 +114,7 @@ async def process_recovery_webhook(event_id: uuid.UUID, app) -> None:
                     
                     event.status = WebhookEventStatus.AWAITING_FEEDBACK
                     await session.commit()
-                    print("[WEBHOOK] Morning prompt sent, status=AWAITING_FEEDBACK")
+                    logger.info("[WEBHOOK] Morning prompt sent, status=AWAITING_FEEDBACK")
                     return
                 
                 # 4. Generate and send plan
@@ -108,7 +122,11 @@ async def process_recovery_webhook(event_id: uuid.UUID, app) -> None:
                 recovery_score = recovery.get("score", {}).get("recovery_score", 0)
                 
                 bot = app.state.tg_app.bot
-                print(f"[WEBHOOK] Sending plan to telegram_id={user.telegram_id}, recovery={recovery_score}")
+                logger.debug(
+                    "[WEBHOOK] Sending plan to telegram_id=%s, recovery=%s",
+                    user.telegram_id,
+                    recovery_score,
+                )
                 await bot.send_message(
                     chat_id=user.telegram_id,
                     text=(
@@ -121,14 +139,22 @@ async def process_recovery_webhook(event_id: uuid.UUID, app) -> None:
                 event.status = WebhookEventStatus.DONE
                 event.processed_at = datetime.now(UTC)
                 await session.commit()
-                print("[WEBHOOK] Plan sent, status=DONE")
+                logger.info("[WEBHOOK] Plan sent, status=DONE")
                 
             finally:
                 await client.close()
                 
         except Exception as e:
-            print(f"[WEBHOOK] ERROR: {type(e).__name__}: {e}")
-            event.status = WebhookEventStatus.FAILED
-            event.error_message = str(e)[:500]
+            logger.error("[WEBHOOK] ERROR: %s: %s", type(e).__name__, e)
+            # Discard partial work, then record the failure in one UPDATE
+            await session.rollback()
+            await session.execute(
+                update(WebhookEvent)
+                .where(WebhookEvent.id == event_id)
+                .values(
+                    status=WebhookEventStatus.FAILED,
+                    error_message=str(e)[:500],
+                )
+            )
             await session.commit()
             raise
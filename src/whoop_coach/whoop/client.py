@@ -1,8 +1,8 @@
 """WHOOP API client."""
 
 import secrets
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
 from typing import Any
 from urllib.parse import urlencode
 
@@ -19,6 +19,13 @@ class TokenResponse:
     refresh_token: str
     expires_in: int
     token_type: str = "Bearer"
+    # Captured once when the tokens are received, not on every serialization
+    obtained_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+
+    @property
+    def expires_at(self) -> datetime:
+        """Absolute access token expiry (obtained_at + expires_in)."""
+        return self.obtained_at + timedelta(seconds=self.expires_in)
 
     def to_dict(self) -> dict:
         return {
@@ -26,17 +33,24 @@ class TokenResponse:
             "refresh_token": self.refresh_token,
             "expires_in": self.expires_in,
             "token_type": self.token_type,
-            "obtained_at": datetime.utcnow().isoformat(),
+            "obtained_at": self.obtained_at.isoformat(timespec="seconds"),
         }
 
     @classmethod
     def from_dict(cls, data: dict) -> "TokenResponse":
-        return cls(
+        token = cls(
             access_token=data["access_token"],
             refresh_token=data["refresh_token"],
             expires_in=data.get("expires_in", 3600),
             token_type=data.get("token_type", "Bearer"),
         )
+        if data.get("obtained_at"):
+            obtained_at = datetime.fromisoformat(data["obtained_at"])
+            # Older blobs were written with naive utcnow()
+            if obtained_at.tzinfo is None:
+                obtained_at = obtained_at.replace(tzinfo=UTC)
+            token.obtained_at = obtained_at
+        return token
 
 
 class WhoopClient:
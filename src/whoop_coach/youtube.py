@@ -1,14 +1,23 @@
 """YouTube URL parsing utilities."""
 
 import re
-from urllib.parse import parse_qs, urlparse
-
-
-# Regex patterns for YouTube video IDs (11 chars: alphanumeric + _ + -)
-_VIDEO_ID_PATTERN = re.compile(r"^[a-zA-Z0-9_-]{11}$")
-
-
-def parse_youtube_url(url: str) -> str | None:
+from collections.abc import Iterable
+from functools import lru_cache
+
+# One anchored pass over every supported shape; the group is the video ID
+# (11 chars: alphanumeric + _ + -). Host and route match case-insensitively.
+_YT_PATTERN = (
+    r"^https?://(?:www\.|m\.)?"
+    r"(?:youtu\.be/|youtube\.com/(?:watch\?(?:[^&#]*&)*v=|shorts/|embed/|v/))"
+    r"([A-Za-z0-9_-]{11})"
+    r"(?:[?&/#].*)?$"
+)
+_YT_RE = re.compile(_YT_PATTERN, re.IGNORECASE)
+# Same pattern for raw bytes (e.g. straight from a webhook body)
+_YT_RE_B = re.compile(_YT_PATTERN.encode("ascii"), re.IGNORECASE)
+
+
+def parse_youtube_url(url: str | bytes) -> str | None:
     """Extract video ID from YouTube URL.
 
     Supports:
@@ -18,53 +27,50 @@ def parse_youtube_url(url: str) -> str | None:
     - https://youtube.com/shorts/VIDEO_ID
     - URLs with additional params (t=, list=, etc.)
 
+    Accepts str or undecoded bytes; the ID is always returned as str.
+
     Returns:
         Video ID (11 chars) or None if not a valid YouTube URL.
     """
-    if not url:
+    if not url or not _maybe_youtube(url):
         return None
 
-    try:
-        parsed = urlparse(url.strip())
-    except Exception:
-        return None
+    return _parse_stripped(url.strip())
 
-    host = parsed.netloc.lower().replace("www.", "").replace("m.", "")
 
-    # youtu.be/VIDEO_ID
-    if host == "youtu.be":
-        video_id = parsed.path.lstrip("/").split("/")[0]
-        if _VIDEO_ID_PATTERN.match(video_id):
-            return video_id
-        return None
+def parse_youtube_urls(urls: Iterable[str | bytes]) -> list[str | None]:
+    """Batch variant of parse_youtube_url: one result per input, in order.
 
-    # youtube.com variants
-    if host not in ("youtube.com",):
-        return None
+    Skips the per-URL wrapper call; candidates go straight to the cached
+    stripped-URL parser.
+    """
+    parse = _parse_stripped
+    check = _maybe_youtube
+    return [parse(url.strip()) if url and check(url) else None for url in urls]
 
-    path = parsed.path.lower()
 
-    # /watch?v=VIDEO_ID
-    if path == "/watch":
-        qs = parse_qs(parsed.query)
-        video_ids = qs.get("v", [])
-        if video_ids and _VIDEO_ID_PATTERN.match(video_ids[0]):
-            return video_ids[0]
-        return None
+def _maybe_youtube(url: str | bytes) -> bool:
+    """Cheap substring pre-check, run before the cache.
 
-    # /shorts/VIDEO_ID
-    if path.startswith("/shorts/"):
-        video_id = parsed.path.split("/")[2] if len(parsed.path.split("/")) > 2 else ""
-        if _VIDEO_ID_PATTERN.match(video_id):
-            return video_id
-        return None
+    Most chat words aren't YouTube links; rejecting them here keeps them
+    out of the LRU cache, where they would evict real URLs.
+    """
+    if isinstance(url, bytes):
+        return b"youtu" in url.lower()
+    return "youtu" in url.lower()
+
+
+@lru_cache(maxsize=1024)
+def _parse_stripped(url: str | bytes) -> str | None:
+    """Memoized parse of a stripped candidate URL (forwards and retries repeat links)."""
+    if isinstance(url, bytes):
+        m = _YT_RE_B.match(url)
+        return m.group(1).decode("ascii") if m else None
+
+    m = _YT_RE.match(url)
+    return m.group(1) if m else None
 
-    # /embed/VIDEO_ID or /v/VIDEO_ID
-    if path.startswith("/embed/") or path.startswith("/v/"):
-        parts = parsed.path.split("/")
-        video_id = parts[2] if len(parts) > 2 else ""
-        if _VIDEO_ID_PATTERN.match(video_id):
-            return video_id
-        return None
 
-    return None
+# Expose the parse cache's lru_cache hooks on the public entry point
+parse_youtube_url.cache_info = _parse_stripped.cache_info
+parse_youtube_url.cache_clear = _parse_stripped.cache_clear
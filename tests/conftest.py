@@ -0,0 +1,66 @@
+"""Shared pytest fixtures."""
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from whoop_coach.db.models import Base
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """Create the in-memory SQLite schema once for the whole run."""
+    # One pinned connection: every checkout sees the same in-memory database
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    # pysqlite defers BEGIN on its own; let SQLAlchemy emit it so SAVEPOINTs work
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, _record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "connect")
+    def _fast_pragmas(dbapi_connection, _record):
+        # Test data is throwaway: skip journal/fsync bookkeeping
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(engine):
+    """Per-test session inside an outer transaction rolled back at teardown.
+
+    Test code may commit freely: commits only release a SAVEPOINT.
+    """
+    with engine.connect() as connection:
+        trans = connection.begin()
+        with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
+            yield session
+        trans.rollback()
+
+
+@pytest.fixture
+async def async_db_session():
+    """Create an in-memory async SQLite database for service queries."""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
@@ -1,19 +1,9 @@
 """Test database models."""
 
-import pytest
-from sqlalchemy import create_engine, select
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from whoop_coach.db.models import Base, EquipmentProfile, User
-
-
-@pytest.fixture
-def db_session():
-    """Create an in-memory SQLite database for testing."""
-    engine = create_engine("sqlite:///:memory:")
-    Base.metadata.create_all(engine)
-    with Session(engine) as session:
-        yield session
+from whoop_coach.db.models import EquipmentProfile, User
 
 
 def test_create_user(db_session: Session):
@@ -1,209 +1,199 @@
 """Tests for planner module: constraints and scoring."""
 
+from collections import defaultdict
+from functools import cache
+from typing import NamedTuple
+
 import pytest
 
 from whoop_coach.db.models import EquipmentProfile
-from whoop_coach.planner.options import ALL_OPTIONS, WorkoutType
+from whoop_coach.planner.options import (
+    ALL_OPTIONS,
+    WorkoutOption,
+    WorkoutType,
+    get_option_by_id,
+)
 from whoop_coach.planner.constraints import filter_options, ensure_z3_included
 from whoop_coach.planner.scoring import score_options, select_top_options
 
+pytestmark = pytest.mark.xdist_group("planner")
+
+
+_RUN_TYPES = frozenset(t for t in WorkoutType if "run" in t.value)
+
+
+def ids_of_type(opts, workout_type: WorkoutType) -> list[str]:
+    """Ids of options with the given type, in input order."""
+    return [o.id for o in opts if o.type is workout_type]
+
+
+def run_ids(opts) -> list[str]:
+    """Ids of run options (any zone), in input order."""
+    return [o.id for o in opts if o.type in _RUN_TYPES]
+
+
+# Default scenario: home_full, no pain/soreness, no Z4 history
+BASE_KWARGS = dict(
+    all_options=ALL_OPTIONS,
+    equipment_profile=EquipmentProfile.HOME_FULL,
+    pain_locations=None,
+    soreness=None,
+    z4_last_7_days=0,
+    hours_since_last_z4=None,
+    had_heavy_leg_yesterday=False,
+)
+
+
+@cache
+def _filtered(**overrides) -> tuple[WorkoutOption, ...]:
+    """filter_options(**BASE_KWARGS) with hashable overrides, shared across tests.
+
+    pain_locations is passed as a tuple to keep the call hashable.
+    """
+    kwargs = {**BASE_KWARGS, **overrides}
+    if kwargs["pain_locations"] is not None:
+        kwargs["pain_locations"] = list(kwargs["pain_locations"])
+    return tuple(filter_options(**kwargs))
+
+
+class _ScoredIndex(NamedTuple):
+    """Scored options plus id/type lookups built once per context."""
+
+    ranked: list
+    by_id: dict
+    by_type: dict
+
+
+@pytest.fixture(scope="session")
+def scored_cache() -> dict:
+    """score_options_v2(ALL_OPTIONS, ctx) results keyed by (frozen) ScoringContext."""
+    return {}
+
+
+@pytest.fixture(scope="session")
+def scored_for(scored_cache):
+    """Score ALL_OPTIONS once per distinct context across the session."""
+    def _scored_for(ctx) -> _ScoredIndex:
+        if ctx not in scored_cache:
+            ranked = score_options_v2(ALL_OPTIONS, ctx)
+            by_type = defaultdict(list)
+            for s in ranked:
+                by_type[s.option.type].append(s)  # stays best-first
+            scored_cache[ctx] = _ScoredIndex(
+                ranked=ranked,
+                by_id={s.option.id: s for s in ranked},
+                by_type=dict(by_type),
+            )
+        return scored_cache[ctx]
+    return _scored_for
+
+
+@pytest.fixture(scope="module")
+def home_full_filtered() -> tuple[WorkoutOption, ...]:
+    """Options allowed for home_full with no pain, soreness or Z4 history."""
+    return _filtered()
+
+
+class TestOptionsIndex:
+    """Test the option id lookup built at import."""
+
+    def test_get_option_by_id(self):
+        """Every catalog option resolves by id; unknown ids return None."""
+        assert all(get_option_by_id(o.id) is o for o in ALL_OPTIONS)
+        assert get_option_by_id("nope") is None
+
 
 class TestEquipmentConstraints:
     """Test equipment-based filtering."""
 
-    def test_home_full_allows_kettlebell(self):
-        """Equipment=home_full → kettlebell options allowed."""
-        filtered = filter_options(
-            all_options=ALL_OPTIONS,
-            equipment_profile=EquipmentProfile.HOME_FULL,
-            pain_locations=None,
-            soreness=None,
-            z4_last_7_days=0,
-            hours_since_last_z4=None,
-            had_heavy_leg_yesterday=False,
-        )
-        kb_ids = [o.id for o in filtered if o.type == WorkoutType.KETTLEBELL]
-        assert "kb_12" in kb_ids
-        assert "kb_20" in kb_ids
-
-    def test_travel_bands_no_kettlebell(self):
-        """Equipment=travel_bands → kettlebell options removed."""
-        filtered = filter_options(
-            all_options=ALL_OPTIONS,
-            equipment_profile=EquipmentProfile.TRAVEL_BANDS,
-            pain_locations=None,
-            soreness=None,
-            z4_last_7_days=0,
-            hours_since_last_z4=None,
-            had_heavy_leg_yesterday=False,
-        )
-        kb_ids = [o.id for o in filtered if o.type == WorkoutType.KETTLEBELL]
-        assert len(kb_ids) == 0
-        # But bands should be allowed
-        bands_ids = [o.id for o in filtered if o.type == WorkoutType.BANDS]
-        assert "bands_strength" in bands_ids
-
-    def test_travel_none_no_equipment(self):
-        """Equipment=travel_none → kettlebell + bands removed."""
-        filtered = filter_options(
-            all_options=ALL_OPTIONS,
-            equipment_profile=EquipmentProfile.TRAVEL_NONE,
-            pain_locations=None,
-            soreness=None,
-            z4_last_7_days=0,
-            hours_since_last_z4=None,
-            had_heavy_leg_yesterday=False,
-        )
-        kb_ids = [o.id for o in filtered if o.type == WorkoutType.KETTLEBELL]
-        bands_ids = [o.id for o in filtered if o.type == WorkoutType.BANDS]
-        assert len(kb_ids) == 0
-        assert len(bands_ids) == 0
-        # Bodyweight should be allowed
-        bw_ids = [o.id for o in filtered if o.type == WorkoutType.BODYWEIGHT]
-        assert "bodyweight_strength" in bw_ids
+    @pytest.mark.parametrize(
+        "profile, kb_ids, bands_ids",
+        [
+            (EquipmentProfile.HOME_FULL, ["kb_12", "kb_20"], ["bands_strength"]),
+            (EquipmentProfile.TRAVEL_BANDS, [], ["bands_strength"]),
+            (EquipmentProfile.TRAVEL_NONE, [], []),
+        ],
+        ids=["home_full", "travel_bands", "travel_none"],
+    )
+    def test_equipment_profile(self, profile, kb_ids, bands_ids):
+        """Kettlebell needs home_full, bands need home_full/travel_bands; bodyweight always."""
+        filtered = _filtered(equipment_profile=profile)
+        assert ids_of_type(filtered, WorkoutType.KETTLEBELL) == kb_ids
+        assert ids_of_type(filtered, WorkoutType.BANDS) == bands_ids
+        assert any(o.id == "bodyweight_strength" for o in filtered)
 
 
 class TestPainConstraints:
     """Test pain-based filtering."""
 
-    def test_leg_pain_no_running(self):
-        """Pain=['колено'] → all run options removed."""
-        filtered = filter_options(
-            all_options=ALL_OPTIONS,
-            equipment_profile=EquipmentProfile.HOME_FULL,
-            pain_locations=["колено"],
-            soreness=None,
-            z4_last_7_days=0,
-            hours_since_last_z4=None,
-            had_heavy_leg_yesterday=False,
-        )
-        run_ids = [o.id for o in filtered if "run" in o.type.value]
-        assert len(run_ids) == 0
-        # Mobility should still be allowed
+    @pytest.mark.parametrize(
+        "pain, runs_allowed",
+        [(("колено",), False), (("плечо",), True)],
+        ids=["leg_pain", "upper_body_pain"],
+    )
+    def test_pain_and_running(self, pain, runs_allowed):
+        """Leg pain removes all runs; upper-body pain doesn't. Mobility stays."""
+        filtered = _filtered(pain_locations=pain)
+        assert bool(run_ids(filtered)) is runs_allowed
         assert any(o.id == "mobility" for o in filtered)
 
-    def test_upper_body_pain_allows_running(self):
-        """Pain=['плечо'] → running still allowed (not leg pain)."""
-        filtered = filter_options(
-            all_options=ALL_OPTIONS,
-            equipment_profile=EquipmentProfile.HOME_FULL,
-            pain_locations=["плечо"],
-            soreness=None,
-            z4_last_7_days=0,
-            hours_since_last_z4=None,
-            had_heavy_leg_yesterday=False,
-        )
-        run_ids = [o.id for o in filtered if "run" in o.type.value]
-        assert len(run_ids) > 0
-
 
 class TestSorenessConstraints:
     """Test soreness-based filtering."""
 
-    def test_soreness_3_low_impact_only(self):
-        """Soreness=3 → only mobility/barre/walking/light strength."""
-        filtered = filter_options(
-            all_options=ALL_OPTIONS,
-            equipment_profile=EquipmentProfile.HOME_FULL,
-            pain_locations=None,
-            soreness=3,
-            z4_last_7_days=0,
-            hours_since_last_z4=None,
-            had_heavy_leg_yesterday=False,
-        )
-        # No running
-        run_ids = [o.id for o in filtered if "run" in o.type.value]
-        assert len(run_ids) == 0
-        # No kb_20 (heavy)
-        assert not any(o.id == "kb_20" for o in filtered)
-        # But kb_12 is allowed
-        assert any(o.id == "kb_12" for o in filtered)
-        # Mobility allowed
-        assert any(o.id == "mobility" for o in filtered)
-
-    def test_soreness_2_no_z4(self):
-        """Soreness=2 → Z4 removed, Z3 allowed if recovery good."""
-        filtered = filter_options(
-            all_options=ALL_OPTIONS,
-            equipment_profile=EquipmentProfile.HOME_FULL,
-            pain_locations=None,
-            soreness=2,
-            z4_last_7_days=0,
-            hours_since_last_z4=None,
-            had_heavy_leg_yesterday=False,
-            recovery_score=70,  # Good recovery
-        )
-        z4_ids = [o.id for o in filtered if o.type == WorkoutType.RUN_Z4]
-        z3_ids = [o.id for o in filtered if o.type == WorkoutType.RUN_Z3]
-        assert len(z4_ids) == 0
-        assert len(z3_ids) > 0
+    @pytest.mark.parametrize(
+        "soreness, recovery, blocked_types, blocked_ids, allowed_ids",
+        [
+            # Soreness=3 → only mobility/barre/walking/light strength
+            (
+                3, None,
+                {WorkoutType.RUN_Z2, WorkoutType.RUN_Z3, WorkoutType.RUN_Z4},
+                {"kb_20"},
+                {"kb_12", "mobility"},
+            ),
+            # Soreness=2 → Z4 removed, Z3 allowed if recovery good
+            (2, 70, {WorkoutType.RUN_Z4}, set(), {"run_z3_30"}),
+        ],
+        ids=["soreness_3", "soreness_2_good_recovery"],
+    )
+    def test_soreness(self, soreness, recovery, blocked_types, blocked_ids, allowed_ids):
+        """Soreness blocks option types/ids and keeps the light ones."""
+        filtered = _filtered(soreness=soreness, recovery_score=recovery)
+        ids = {o.id for o in filtered}
+        assert not any(o.type in blocked_types for o in filtered)
+        assert not ids & blocked_ids
+        assert allowed_ids <= ids
 
 
 class TestZ4Limits:
     """Test Z4 workout limits."""
 
-    def test_z4_limit_reached(self):
-        """Z4 count=2 → Z4 options removed."""
-        filtered = filter_options(
-            all_options=ALL_OPTIONS,
-            equipment_profile=EquipmentProfile.HOME_FULL,
-            pain_locations=None,
-            soreness=None,
-            z4_last_7_days=2,  # Limit reached
-            hours_since_last_z4=72,
-            had_heavy_leg_yesterday=False,
-        )
-        z4_ids = [o.id for o in filtered if o.type == WorkoutType.RUN_Z4]
-        assert len(z4_ids) == 0
-
-    def test_z4_48h_cooldown(self):
-        """Z4 < 48h ago → Z4 removed."""
-        filtered = filter_options(
-            all_options=ALL_OPTIONS,
-            equipment_profile=EquipmentProfile.HOME_FULL,
-            pain_locations=None,
-            soreness=None,
-            z4_last_7_days=1,
-            hours_since_last_z4=24,  # Only 24h since last Z4
-            had_heavy_leg_yesterday=False,
-        )
-        z4_ids = [o.id for o in filtered if o.type == WorkoutType.RUN_Z4]
-        assert len(z4_ids) == 0
-
-    def test_z4_allowed_after_48h(self):
-        """Z4 >= 48h ago → Z4 allowed."""
-        filtered = filter_options(
-            all_options=ALL_OPTIONS,
-            equipment_profile=EquipmentProfile.HOME_FULL,
-            pain_locations=None,
-            soreness=None,
-            z4_last_7_days=1,
-            hours_since_last_z4=50,  # > 48h
-            had_heavy_leg_yesterday=False,
-        )
-        z4_ids = [o.id for o in filtered if o.type == WorkoutType.RUN_Z4]
-        assert len(z4_ids) > 0
+    @pytest.mark.parametrize(
+        "z4_count, hours_since, z4_allowed",
+        [
+            (2, 72, False),  # Limit reached
+            (1, 24, False),  # Only 24h since last Z4
+            (1, 50, True),  # > 48h
+        ],
+        ids=["limit_reached", "48h_cooldown", "allowed_after_48h"],
+    )
+    def test_z4_limits(self, z4_count, hours_since, z4_allowed):
+        """Max 2 Z4 per 7 days and at least 48h between them."""
+        filtered = _filtered(z4_last_7_days=z4_count, hours_since_last_z4=hours_since)
+        z4_ids = ids_of_type(filtered, WorkoutType.RUN_Z4)
+        assert bool(z4_ids) is z4_allowed
 
 
 class TestZ3Always:
     """Test Z3 is always included when running allowed."""
 
-    def test_z3_always_included(self):
+    def test_z3_always_included(self, home_full_filtered):
         """If run allowed, Z3 in options."""
-        filtered = filter_options(
-            all_options=ALL_OPTIONS,
-            equipment_profile=EquipmentProfile.HOME_FULL,
-            pain_locations=None,
-            soreness=None,
-            z4_last_7_days=0,
-            hours_since_last_z4=None,
-            had_heavy_leg_yesterday=False,
-        )
         # Remove Z3 to test ensure_z3_included
-        filtered_no_z3 = [o for o in filtered if o.type != WorkoutType.RUN_Z3]
+        filtered_no_z3 = [o for o in home_full_filtered if o.type != WorkoutType.RUN_Z3]
         # But keep Z2 to simulate running allowed
         result = ensure_z3_included(filtered_no_z3, ALL_OPTIONS)
-        z3_ids = [o.id for o in result if o.type == WorkoutType.RUN_Z3]
+        z3_ids = ids_of_type(result, WorkoutType.RUN_Z3)
         assert len(z3_ids) >= 1, "Z3 should be added back by ensure_z3_included"
 
 
@@ -244,18 +234,12 @@ class TestScoring:
 class TestOptionSelection:
     """Test option selection logic."""
 
-    def test_select_top_with_variety(self):
+    def test_select_top_with_variety(self, scored_rec70):
         """Selection ensures at least one run and one non-run option."""
-        scored = score_options(
-            options=ALL_OPTIONS,
-            recovery_score=70,
-            yesterday_strain=10,
-            soreness=0,
-        )
-        top3 = select_top_options(scored, count=3, ensure_variety=True)
+        top3 = select_top_options(scored_rec70.ranked, count=3, ensure_variety=True)
         
-        has_run = any("run" in o.option.type.value for o in top3)
-        has_non_run = any("run" not in o.option.type.value for o in top3)
+        has_run = any(o.option.type in _RUN_TYPES for o in top3)
+        has_non_run = any(o.option.type not in _RUN_TYPES for o in top3)
         
         assert has_run, "Should include at least one run option"
         assert has_non_run, "Should include at least one non-run option"
@@ -275,20 +259,32 @@ from whoop_coach.planner.scoring import (
 from whoop_coach.planner.options import get_modality
 
 
+@pytest.fixture(scope="module")
+def scored_rec70(scored_for):
+    """ALL_OPTIONS scored at recovery 70 (same context legacy score_options builds)."""
+    return scored_for(ScoringContext(recovery_score=70))
+
+
+@pytest.fixture(scope="module")
+def diversified_rec70(scored_rec70):
+    """Diversified selection over scored_rec70."""
+    return select_diversified_options(scored_rec70.ranked)
+
+
 class TestSoftScoringFatigue:
     """Test fatigue guardrail rules."""
 
-    def test_fatigue_penalizes_hard_options(self):
+    def test_fatigue_penalizes_hard_options(self, scored_for):
         """recent_heavy_count_3d=2 → Z4 score drops below Z2/Z3."""
         ctx = ScoringContext(
             recovery_score=70,
             recent_heavy_count_3d=2,
         )
-        scored = score_options_v2(ALL_OPTIONS, ctx)
+        scored = scored_for(ctx)
         
-        z4 = next(s for s in scored if s.option.type == WorkoutType.RUN_Z4)
-        z3 = next(s for s in scored if s.option.id == "run_z3_30")
-        z2 = next(s for s in scored if s.option.id == "run_z2_30")
+        z4 = scored.by_type[WorkoutType.RUN_Z4][0]
+        z3 = scored.by_id["run_z3_30"]
+        z2 = scored.by_id["run_z2_30"]
         
         # Z4 should have fatigue penalty, making it rank lower
         assert z3.net_score > z4.net_score, "Z3 should beat Z4 when fatigued"
@@ -297,28 +293,28 @@ class TestSoftScoringFatigue:
         # Verify debug shows fatigue rule
         assert "fatigue_hard" in z4.debug.rules
 
-    def test_fatigue_applies_medium_penalty_to_z3(self):
+    def test_fatigue_applies_medium_penalty_to_z3(self, scored_for):
         """recent_heavy_count_3d=2 → Z3 gets medium penalty."""
         ctx = ScoringContext(
             recovery_score=70,
             recent_heavy_count_3d=2,
         )
-        scored = score_options_v2(ALL_OPTIONS, ctx)
+        scored = scored_for(ctx)
         
-        z3 = next(s for s in scored if s.option.id == "run_z3_30")
+        z3 = scored.by_id["run_z3_30"]
         
         # Verify debug shows fatigue_med rule
         assert "fatigue_med" in z3.debug.rules
 
-    def test_no_fatigue_penalty_when_not_fatigued(self):
+    def test_no_fatigue_penalty_when_not_fatigued(self, scored_for):
         """recent_heavy_count_3d=1 → no fatigue penalty."""
         ctx = ScoringContext(
             recovery_score=70,
             recent_heavy_count_3d=1,  # Below threshold
         )
-        scored = score_options_v2(ALL_OPTIONS, ctx)
+        scored = scored_for(ctx)
         
-        z4 = next(s for s in scored if s.option.type == WorkoutType.RUN_Z4)
+        z4 = scored.by_type[WorkoutType.RUN_Z4][0]
         
         # Should not have fatigue rules
         assert "fatigue_hard" not in z4.debug.rules
@@ -328,41 +324,41 @@ class TestSoftScoringFatigue:
 class TestSoftScoringLegDoms:
     """Test leg DOMS rules."""
 
-    def test_leg_doms_penalizes_running(self):
+    def test_leg_doms_penalizes_running(self, scored_for):
         """last_leg_doms_high=True → mobility outranks run Z3."""
         ctx = ScoringContext(
             recovery_score=70,
             last_leg_doms_high=True,
         )
-        scored = score_options_v2(ALL_OPTIONS, ctx)
+        scored = scored_for(ctx)
         
-        mobility = next(s for s in scored if s.option.type == WorkoutType.MOBILITY)
-        z3 = next(s for s in scored if s.option.id == "run_z3_30")
+        mobility = scored.by_type[WorkoutType.MOBILITY][0]
+        z3 = scored.by_id["run_z3_30"]
         
         assert mobility.net_score > z3.net_score, "Mobility should beat Z3 when leg DOMS"
         assert "legs_doms" in z3.debug.rules
 
-    def test_leg_doms_boosts_mobility(self):
+    def test_leg_doms_boosts_mobility(self, scored_for):
         """last_leg_doms_high=True → mobility gets DOMS boost."""
         ctx = ScoringContext(
             recovery_score=70,
             last_leg_doms_high=True,
         )
-        scored = score_options_v2(ALL_OPTIONS, ctx)
+        scored = scored_for(ctx)
         
-        mobility = next(s for s in scored if s.option.type == WorkoutType.MOBILITY)
+        mobility = scored.by_type[WorkoutType.MOBILITY][0]
         
         assert "doms_boost" in mobility.debug.rules
 
-    def test_leg_doms_penalizes_barre(self):
+    def test_leg_doms_penalizes_barre(self, scored_for):
         """last_leg_doms_high=True → barre gets leg doms penalty."""
         ctx = ScoringContext(
             recovery_score=70,
             last_leg_doms_high=True,
         )
-        scored = score_options_v2(ALL_OPTIONS, ctx)
+        scored = scored_for(ctx)
         
-        barre = next(s for s in scored if s.option.type == WorkoutType.BARRE)
+        barre = scored.by_type[WorkoutType.BARRE][0]
         
         assert "legs_doms" in barre.debug.rules
 
@@ -370,45 +366,45 @@ class TestSoftScoringLegDoms:
 class TestSoftScoringAntiRepeat:
     """Test anti-repeat modality rules."""
 
-    def test_antirepeat_penalizes_same_modality(self):
+    def test_antirepeat_penalizes_same_modality(self, scored_for):
         """last_modality='strength' → strength loses to barre."""
         ctx = ScoringContext(
             recovery_score=70,
             last_modality="strength",
         )
-        scored = score_options_v2(ALL_OPTIONS, ctx)
+        scored = scored_for(ctx)
         
-        kb = next(s for s in scored if s.option.id == "kb_12")
-        barre = next(s for s in scored if s.option.type == WorkoutType.BARRE)
+        kb = scored.by_id["kb_12"]
+        barre = scored.by_type[WorkoutType.BARRE][0]
         
         # Barre should be higher (no repeat penalty)
         assert barre.net_score > kb.net_score, "Barre should beat KB when last was strength"
         assert "repeat_mod" in kb.debug.rules
 
-    def test_antirepeat_2day_penalty(self):
+    def test_antirepeat_2day_penalty(self, scored_for):
         """last_two_modalities=(run,run) → run gets extra penalty."""
         ctx = ScoringContext(
             recovery_score=70,
             last_modality="run",
             last_two_modalities=("run", "run"),
         )
-        scored = score_options_v2(ALL_OPTIONS, ctx)
+        scored = scored_for(ctx)
         
-        z3 = next(s for s in scored if s.option.id == "run_z3_30")
+        z3 = scored.by_id["run_z3_30"]
         
         # Should have both repeat penalties
         assert "repeat_mod" in z3.debug.rules
         assert "repeat_2d" in z3.debug.rules
 
-    def test_no_repeat_penalty_different_modality(self):
+    def test_no_repeat_penalty_different_modality(self, scored_for):
         """last_modality='strength' → run has no repeat penalty."""
         ctx = ScoringContext(
             recovery_score=70,
             last_modality="strength",
         )
-        scored = score_options_v2(ALL_OPTIONS, ctx)
+        scored = scored_for(ctx)
         
-        z3 = next(s for s in scored if s.option.id == "run_z3_30")
+        z3 = scored.by_id["run_z3_30"]
         
         assert "repeat_mod" not in z3.debug.rules
 
@@ -416,41 +412,41 @@ class TestSoftScoringAntiRepeat:
 class TestSoftScoringZ4:
     """Test Z4 'not default' rules."""
 
-    def test_z4_not_default_mid_recovery(self):
+    def test_z4_not_default_mid_recovery(self, scored_for):
         """recovery=70 → Z4 gets penalty, not primary."""
         ctx = ScoringContext(recovery_score=70)
-        scored = score_options_v2(ALL_OPTIONS, ctx)
+        scored = scored_for(ctx)
         
-        z4 = next(s for s in scored if s.option.type == WorkoutType.RUN_Z4)
+        z4 = scored.by_type[WorkoutType.RUN_Z4][0]
         
         # Z4 should not be rank 1
         assert z4.rank > 1, "Z4 should not be primary at recovery=70"
         assert "z4_low_rec" in z4.debug.rules
 
-    def test_z4_great_day_bonus(self):
+    def test_z4_great_day_bonus(self, scored_for):
         """recovery=90, no fatigue, no doms → Z4 gets bonus."""
         ctx = ScoringContext(
             recovery_score=90,
             recent_heavy_count_3d=0,
             last_leg_doms_high=False,
         )
-        scored = score_options_v2(ALL_OPTIONS, ctx)
+        scored = scored_for(ctx)
         
-        z4 = next(s for s in scored if s.option.type == WorkoutType.RUN_Z4)
+        z4 = scored.by_type[WorkoutType.RUN_Z4][0]
         
         assert "z4_great" in z4.debug.rules
         # Z4 should rank highly on great days
         assert z4.rank <= 2, "Z4 should be top 2 on great day"
 
-    def test_z4_no_bonus_when_fatigued(self):
+    def test_z4_no_bonus_when_fatigued(self, scored_for):
         """recovery=90 but fatigued → no Z4 bonus."""
         ctx = ScoringContext(
             recovery_score=90,
             recent_heavy_count_3d=2,  # Fatigued
         )
-        scored = score_options_v2(ALL_OPTIONS, ctx)
+        scored = scored_for(ctx)
         
-        z4 = next(s for s in scored if s.option.type == WorkoutType.RUN_Z4)
+        z4 = scored.by_type[WorkoutType.RUN_Z4][0]
         
         # No great day bonus because fatigued
         assert "z4_great" not in z4.debug.rules
@@ -461,54 +457,34 @@ class TestSoftScoringZ4:
 class TestDiversifiedSelection:
     """Test diversified option selection."""
 
-    def test_includes_easy_alternative(self):
+    def test_includes_easy_alternative(self, diversified_rec70):
         """Output includes mobility/walk/run_z2."""
-        ctx = ScoringContext(recovery_score=70)
-        scored = score_options_v2(ALL_OPTIONS, ctx)
-        selected = select_diversified_options(scored)
-        
         easy_types = {WorkoutType.MOBILITY, WorkoutType.WALKING, WorkoutType.RUN_Z2}
-        has_easy = any(s.option.type in easy_types for s in selected)
+        has_easy = any(s.option.type in easy_types for s in diversified_rec70)
         
         assert has_easy, "Should include at least one easy option"
 
-    def test_includes_different_modality(self):
+    def test_includes_different_modality(self, diversified_rec70):
         """Output has at least 2 distinct modalities."""
-        ctx = ScoringContext(recovery_score=70)
-        scored = score_options_v2(ALL_OPTIONS, ctx)
-        selected = select_diversified_options(scored)
-        
-        modalities = {get_modality(s.option) for s in selected}
+        modalities = {get_modality(s.option) for s in diversified_rec70}
         
         assert len(modalities) >= 2, "Should have at least 2 modalities"
 
-    def test_returns_2_to_3_options(self):
+    def test_returns_2_to_3_options(self, diversified_rec70):
         """Output has 2-3 options."""
-        ctx = ScoringContext(recovery_score=70)
-        scored = score_options_v2(ALL_OPTIONS, ctx)
-        selected = select_diversified_options(scored)
-        
-        assert 2 <= len(selected) <= 3, "Should return 2-3 options"
+        assert 2 <= len(diversified_rec70) <= 3, "Should return 2-3 options"
 
-    def test_primary_is_best_score(self):
+    def test_primary_is_best_score(self, scored_rec70, diversified_rec70):
         """Primary option is the best scored."""
-        ctx = ScoringContext(recovery_score=70)
-        scored = score_options_v2(ALL_OPTIONS, ctx)
-        selected = select_diversified_options(scored)
-        
         # Selected is sorted by score, so first should be best
-        selected_ids = [s.option.id for s in selected]
-        best_overall_id = scored[0].option.id
+        selected_ids = [s.option.id for s in diversified_rec70]
+        best_overall_id = scored_rec70.ranked[0].option.id
         
         assert best_overall_id in selected_ids, "Best option should be in selection"
 
-    def test_no_duplicate_option_ids(self):
+    def test_no_duplicate_option_ids(self, diversified_rec70):
         """No duplicate option IDs in selection."""
-        ctx = ScoringContext(recovery_score=70)
-        scored = score_options_v2(ALL_OPTIONS, ctx)
-        selected = select_diversified_options(scored)
-        
-        ids = [s.option.id for s in selected]
+        ids = [s.option.id for s in diversified_rec70]
         
         assert len(ids) == len(set(ids)), "Should have no duplicate options"
 
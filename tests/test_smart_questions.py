@@ -2,6 +2,7 @@
 
 import pytest
 from datetime import datetime, timezone, timedelta
+from functools import cache
 
 from whoop_coach.smart_questions import (
     RISKY_ALWAYS,
@@ -17,6 +18,20 @@ from whoop_coach.smart_questions import (
     _get_local_end_hour,
 )
 
+pytestmark = pytest.mark.xdist_group("smart_q")
+
+
+# Frozen reference day: tests only care about hour-of-day and durations
+_REF_NOW = datetime(2025, 1, 15, tzinfo=timezone.utc)
+
+
+@cache
+def _workout_timestamps(end_hour_utc: int, duration_min: int) -> tuple[str, str]:
+    """ISO (start, end) strings on the reference day, built once per pair."""
+    end = _REF_NOW.replace(hour=end_hour_utc)
+    start = end - timedelta(minutes=duration_min)
+    return start.isoformat(), end.isoformat()
+
 
 def _make_workout(
     sport_id: int | None = 48,
@@ -28,13 +43,12 @@ def _make_workout(
     timezone_offset: str | None = None,
 ) -> dict:
     """Helper to create mock WHOOP workout."""
-    now = datetime.now(timezone.utc).replace(hour=end_hour_utc, minute=0, second=0)
-    start = now - timedelta(minutes=duration_min)
+    start_iso, end_iso = _workout_timestamps(end_hour_utc, duration_min)
     
     workout = {
         "id": "123456",
-        "start": start.isoformat(),
-        "end": now.isoformat(),
+        "start": start_iso,
+        "end": end_iso,
         "score_state": score_state,
         "score": {
             "strain": strain,
@@ -55,60 +69,27 @@ def _make_workout(
 class TestRiskySportDetection:
     """Test sport risk classification."""
 
-    def test_skiing_is_always_risky(self):
-        """Skiing (sport_id=29) should be always-risky."""
-        workout = _make_workout(sport_id=29, sport_name="Skiing")
-        assert _is_risky_always(workout) is True
-        assert _is_risky_contact(workout) is False
-
-    def test_snowboarding_is_always_risky(self):
-        """Snowboarding (sport_id=91) should be always-risky."""
-        workout = _make_workout(sport_id=91, sport_name="Snowboarding")
-        assert _is_risky_always(workout) is True
-
-    def test_hiking_is_always_risky(self):
-        """Hiking (sport_id=52) should be always-risky."""
-        workout = _make_workout(sport_id=52, sport_name="Hiking/Rucking")
-        assert _is_risky_always(workout) is True
-
-    def test_cross_country_skiing_is_always_risky(self):
-        """Cross Country Skiing (sport_id=47) should be always-risky."""
-        workout = _make_workout(sport_id=47, sport_name="Cross Country Skiing")
-        assert _is_risky_always(workout) is True
-
-    def test_basketball_is_contact_risky(self):
-        """Basketball (sport_id=17) should be contact-risky."""
-        workout = _make_workout(sport_id=17, sport_name="Basketball")
-        assert _is_risky_always(workout) is False
-        assert _is_risky_contact(workout) is True
-
-    def test_hiit_is_contact_risky(self):
-        """HIIT (sport_id=96) should be contact-risky."""
-        workout = _make_workout(sport_id=96, sport_name="HIIT")
-        assert _is_risky_contact(workout) is True
-
-    def test_strength_not_risky(self):
-        """Strength training should not be risky."""
-        workout = _make_workout(sport_id=48, sport_name="Strength Training")
-        assert _is_risky_always(workout) is False
-        assert _is_risky_contact(workout) is False
-
-    def test_fallback_to_sport_name_keywords(self):
-        """When sport_id is None, fallback to sport_name keywords."""
-        # Skiing in name but no sport_id (deprecated after 09/2025)
-        workout = _make_workout(sport_id=None, sport_name="Skiing - Alpine")
-        assert _is_risky_always(workout) is True
-
-    def test_fallback_hiking_keyword(self):
-        """Hiking keyword detected in sport_name."""
-        workout = _make_workout(sport_id=None, sport_name="Hiking Trail Run")
-        assert _is_risky_always(workout) is True
-
-    def test_unknown_sport_not_risky(self):
-        """Unknown sport is not risky by default."""
-        workout = _make_workout(sport_id=999, sport_name="Unknown Activity")
-        assert _is_risky_always(workout) is False
-        assert _is_risky_contact(workout) is False
+    @pytest.mark.parametrize(
+        "sport_id, sport_name, always, contact",
+        [
+            (29, "Skiing", True, False),
+            (91, "Snowboarding", True, False),
+            (52, "Hiking/Rucking", True, False),
+            (47, "Cross Country Skiing", True, False),
+            (17, "Basketball", False, True),
+            (96, "HIIT", False, True),
+            (48, "Strength Training", False, False),
+            # No sport_id (deprecated after 09/2025) → sport_name keywords
+            (None, "Skiing - Alpine", True, False),
+            (None, "Hiking Trail Run", True, False),
+            (999, "Unknown Activity", False, False),
+        ],
+    )
+    def test_risk_classification(self, sport_id, sport_name, always, contact):
+        """Sport id (or name keyword fallback) maps to always/contact risk."""
+        workout = _make_workout(sport_id=sport_id, sport_name=sport_name)
+        assert _is_risky_always(workout) is always
+        assert _is_risky_contact(workout) is contact
 
 
 class TestNeedMoreInfoScore:
@@ -231,13 +212,8 @@ class TestDurationCalculation:
 
     def test_duration_minutes_calculated(self):
         """Duration calculated from start/end."""
-        now = datetime.now(timezone.utc)
-        start = now - timedelta(minutes=45)
-        
-        workout = {
-            "start": start.isoformat(),
-            "end": now.isoformat(),
-        }
+        start_iso, end_iso = _workout_timestamps(10, 45)
+        workout = {"start": start_iso, "end": end_iso}
         
         duration = _get_duration_minutes(workout)
         assert duration == 45
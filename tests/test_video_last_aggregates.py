@@ -1,69 +1,88 @@
 """Tests for video_last aggregates and helpers."""
 
 import pytest
+from dataclasses import astuple
 from datetime import datetime, timezone
-from uuid import uuid4
+from types import SimpleNamespace
 
-from sqlalchemy import create_engine
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from whoop_coach.db.models import (
-    Base, Feedback, PendingLog, PendingLogState, User, Video, EquipmentProfile
+    Feedback, PendingLog, PendingLogState, User, Video, EquipmentProfile
 )
 from whoop_coach.videos.service import (
+    create_log_with_video,
+    get_video_aggregates_by_profile,
+    get_videos_overall_aggregates,
     format_session_metrics,
     profile_key,
     rpe_mean_to_words,
     escape_html,
 )
 
-
-@pytest.fixture
-def db_session():
-    """Create an in-memory SQLite database for testing."""
-    engine = create_engine("sqlite:///:memory:")
-    Base.metadata.create_all(engine)
-    with Session(engine) as session:
-        yield session
+# Fixed timestamp: these tests never depend on wall-clock time
+NOW = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
 
 
 class TestHelpers:
     """Tests for helper functions."""
 
-    def test_profile_key_normal(self):
-        """Profile key with both values."""
-        assert profile_key(20, 12) == "H20-S12"
-        assert profile_key(12, 20) == "H12-S20"
-
-    def test_profile_key_with_none(self):
-        """Profile key with None values shows ?."""
-        assert profile_key(None, 12) == "H?-S12"
-        assert profile_key(20, None) == "H20-S?"
-        assert profile_key(None, None) == "H?-S?"
-
-    def test_rpe_mean_to_words_ranges(self):
+    @pytest.mark.parametrize(
+        "heavy, swing, expected",
+        [
+            (20, 12, "H20-S12"),
+            (12, 20, "H12-S20"),
+            # None values show ?
+            (None, 12, "H?-S12"),
+            (20, None, "H20-S?"),
+            (None, None, "H?-S?"),
+            # 0 is a weight, not a missing one (matches the SQL key)
+            (0, 12, "H0-S12"),
+        ],
+    )
+    def test_profile_key(self, heavy, swing, expected):
+        """Profile key renders both weights, ? for missing ones."""
+        assert profile_key(heavy, swing) == expected
+
+    @pytest.mark.parametrize(
+        "mean, expected",
+        [
+            (1.0, "Сделал разминку"),
+            (1.4, "Сделал разминку"),
+            (2.0, "Мог бы сделать ещё одну"),
+            (2.4, "Мог бы сделать ещё одну"),
+            (3.0, "Хватит на сегодня"),
+            (3.4, "Хватит на сегодня"),
+            (4.0, "Еле дожал"),
+            (4.4, "Еле дожал"),
+            (5.0, "Меня вынесло"),
+        ],
+    )
+    def test_rpe_mean_to_words_ranges(self, mean, expected):
         """RPE mean correctly maps to Variant C masculine words."""
-        assert rpe_mean_to_words(1.0) == "Сделал разминку"
-        assert rpe_mean_to_words(1.4) == "Сделал разминку"
-        assert rpe_mean_to_words(2.0) == "Мог бы сделать ещё одну"
-        assert rpe_mean_to_words(2.4) == "Мог бы сделать ещё одну"
-        assert rpe_mean_to_words(3.0) == "Хватит на сегодня"
-        assert rpe_mean_to_words(3.4) == "Хватит на сегодня"
-        assert rpe_mean_to_words(4.0) == "Еле дожал"
-        assert rpe_mean_to_words(4.4) == "Еле дожал"
-        assert rpe_mean_to_words(5.0) == "Меня вынесло"
-
-    def test_escape_html_basic(self):
+        assert rpe_mean_to_words(mean) == expected
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("<script>", "&lt;script&gt;"),
+            ("Tom & Jerry", "Tom &amp; Jerry"),
+            ('Say "hello"', "Say &quot;hello&quot;"),
+            ("It's fine", "It&#39;s fine"),
+            # Multiple special chars combined
+            (
+                '<b>"Test" & \'more\'</b>',
+                "&lt;b&gt;&quot;Test&quot; &amp; &#39;more&#39;&lt;/b&gt;",
+            ),
+            # Nothing to escape: returned unchanged
+            ("Тренировка с гирей", "Тренировка с гирей"),
+        ],
+        ids=["lt_gt", "amp", "quot", "apos", "combined", "plain"],
+    )
+    def test_escape_html(self, text, expected):
         """Escape HTML special chars."""
-        assert escape_html("<script>") == "&lt;script&gt;"
-        assert escape_html("Tom & Jerry") == "Tom &amp; Jerry"
-        assert escape_html('Say "hello"') == "Say &quot;hello&quot;"
-        assert escape_html("It's fine") == "It&#39;s fine"
-
-    def test_escape_html_combined(self):
-        """Escape multiple special chars."""
-        text = '<b>"Test" & \'more\'</b>'
-        expected = "&lt;b&gt;&quot;Test&quot; &amp; &#39;more&#39;&lt;/b&gt;"
         assert escape_html(text) == expected
 
 
@@ -74,12 +93,12 @@ class TestFormatSessionMetrics:
         """Session metrics shown when WHOOP snapshot present."""
         user = User(telegram_id=123)
         db_session.add(user)
-        db_session.commit()
+        db_session.flush()
 
-        now = datetime.now(timezone.utc)
+        now = NOW
         video = Video(video_id="test123456", usage_count=1, first_seen_at=now, last_used_at=now)
         db_session.add(video)
-        db_session.commit()
+        db_session.flush()
 
         log = PendingLog(
             user_id=user.id,
@@ -108,12 +127,12 @@ class TestFormatSessionMetrics:
         """Shows 'смэтчилось, но метрик нет' when match exists but no metrics."""
         user = User(telegram_id=123)
         db_session.add(user)
-        db_session.commit()
+        db_session.flush()
 
-        now = datetime.now(timezone.utc)
+        now = NOW
         video = Video(video_id="test123456", usage_count=1, first_seen_at=now, last_used_at=now)
         db_session.add(video)
-        db_session.commit()
+        db_session.flush()
 
         log = PendingLog(
             user_id=user.id,
@@ -134,12 +153,12 @@ class TestFormatSessionMetrics:
         """Shows '/retry' when no match."""
         user = User(telegram_id=123)
         db_session.add(user)
-        db_session.commit()
+        db_session.flush()
 
-        now = datetime.now(timezone.utc)
+        now = NOW
         video = Video(video_id="test123456", usage_count=1, first_seen_at=now, last_used_at=now)
         db_session.add(video)
-        db_session.commit()
+        db_session.flush()
 
         log = PendingLog(
             user_id=user.id,
@@ -157,196 +176,341 @@ class TestFormatSessionMetrics:
         assert "/retry" in result
 
 
+@pytest.fixture
+async def seed(async_db_session: AsyncSession) -> SimpleNamespace:
+    """User + video shared by the profile aggregate tests, at a fixed time."""
+    now = NOW
+    user = User(telegram_id=123)
+    video = Video(video_id="test123456", usage_count=1, first_seen_at=now, last_used_at=now)
+    async_db_session.add_all([user, video])
+    await async_db_session.flush()
+    return SimpleNamespace(user=user, video=video, now=now)
+
+
 class TestProfileAggregates:
     """Tests for profile-based aggregates."""
 
-    def test_strain_grouped_by_profile(self, db_session: Session):
+    async def test_strain_grouped_by_profile(
+        self, async_db_session: AsyncSession, seed: SimpleNamespace
+    ):
         """Strain aggregates correctly grouped by KB profile."""
-        user = User(telegram_id=123)
-        db_session.add(user)
-        db_session.commit()
+        user, now = seed.user, seed.now
 
-        now = datetime.now(timezone.utc)
-        video = Video(video_id="test123456", usage_count=3, first_seen_at=now, last_used_at=now)
-        db_session.add(video)
-        db_session.commit()
-
-        # Two logs with H12-S12, strain 8 and 10 -> avg 9
-        log1 = PendingLog(
+        # Aggregate-only test: bulk Core insert, no ORM instances needed
+        base = dict(
             user_id=user.id, video_id="test123456",
             equipment_profile_at_time=EquipmentProfile.HOME_FULL,
             message_timestamp=now, state=PendingLogState.CONFIRMED,
-            kb_heavy_kg_at_time=12, kb_swing_kg_at_time=12,
-            whoop_strain=8.0, whoop_workout_id="w1", matched_at=now,
+            kb_swing_kg_at_time=12, matched_at=now,
         )
-        log2 = PendingLog(
+        await async_db_session.execute(insert(PendingLog), [
+            # Two logs with H12-S12, strain 8 and 10 -> avg 9
+            {**base, "kb_heavy_kg_at_time": 12, "whoop_strain": 8.0, "whoop_workout_id": "w1"},
+            {**base, "kb_heavy_kg_at_time": 12, "whoop_strain": 10.0, "whoop_workout_id": "w2"},
+            # One log with H20-S12, strain 12 -> avg 12
+            {**base, "kb_heavy_kg_at_time": 20, "whoop_strain": 12.0, "whoop_workout_id": "w3"},
+        ])
+        await async_db_session.commit()
+
+        result = await get_video_aggregates_by_profile(async_db_session, user.id, "test123456")
+
+        assert len(result) == 2
+        # H12-S12 has 2 entries (most frequent) - avg 9, no RPE feedback
+        assert astuple(result[0]) == (12, 12, "H12-S12", 9.0, 2, None, 0)
+        # H20-S12 has 1 entry - avg 12
+        assert astuple(result[1]) == (20, 12, "H20-S12", 12.0, 1, None, 0)
+
+    async def test_effort_grouped_by_profile(
+        self, async_db_session: AsyncSession, seed: SimpleNamespace
+    ):
+        """Effort (RPE) aggregates correctly grouped by KB profile."""
+        user, now = seed.user, seed.now
+
+        base = dict(
             user_id=user.id, video_id="test123456",
             equipment_profile_at_time=EquipmentProfile.HOME_FULL,
             message_timestamp=now, state=PendingLogState.CONFIRMED,
-            kb_heavy_kg_at_time=12, kb_swing_kg_at_time=12,
-            whoop_strain=10.0, whoop_workout_id="w2", matched_at=now,
+            kb_swing_kg_at_time=12, matched_at=now,
         )
-        # One log with H20-S12, strain 12 -> avg 12
-        log3 = PendingLog(
+        stmt = insert(PendingLog).returning(PendingLog.id, sort_by_parameter_order=True)
+        log_ids = (await async_db_session.scalars(stmt, [
+            {**base, "kb_heavy_kg_at_time": 12, "whoop_workout_id": "w1"},
+            {**base, "kb_heavy_kg_at_time": 12, "whoop_workout_id": "w2"},
+            {**base, "kb_heavy_kg_at_time": 20, "whoop_workout_id": "w3"},
+        ])).all()
+
+        # Add feedback linked to logs
+        await async_db_session.execute(insert(Feedback), [
+            {"user_id": user.id, "pending_log_id": log_id, "rpe_1_5": rpe}
+            for log_id, rpe in zip(log_ids, (3, 4, 2))
+        ])
+        await async_db_session.commit()
+
+        result = await get_video_aggregates_by_profile(async_db_session, user.id, "test123456")
+
+        assert len(result) == 2
+        # H12-S12: avg of 3 and 4 = 3.5, no strain recorded
+        assert astuple(result[0]) == (12, 12, "H12-S12", None, 0, 3.5, 2)
+        # H20-S12: avg of 2 = 2.0
+        assert astuple(result[1]) == (20, 12, "H20-S12", None, 0, 2.0, 1)
+
+    async def test_excludes_null_profile_rows(self, async_db_session: AsyncSession):
+        """Rows with NULL kb weights are excluded from grouped aggregates."""
+        user = User(telegram_id=123)
+        async_db_session.add_all([
+            user,
+            Video(video_id="test123456", usage_count=2, first_seen_at=NOW, last_used_at=NOW),
+        ])
+        await async_db_session.flush()
+
+        # Log with proper profile
+        log1 = PendingLog(
             user_id=user.id, video_id="test123456",
             equipment_profile_at_time=EquipmentProfile.HOME_FULL,
-            message_timestamp=now, state=PendingLogState.CONFIRMED,
+            message_timestamp=NOW, state=PendingLogState.CONFIRMED,
             kb_heavy_kg_at_time=20, kb_swing_kg_at_time=12,
-            whoop_strain=12.0, whoop_workout_id="w3", matched_at=now,
+            whoop_strain=10.0, whoop_workout_id="w1", matched_at=NOW,
         )
-        db_session.add_all([log1, log2, log3])
-        db_session.commit()
+        # Log with NULL heavy_kg - should be excluded, RPE included
+        log2 = PendingLog(
+            user_id=user.id, video_id="test123456",
+            equipment_profile_at_time=EquipmentProfile.HOME_FULL,
+            message_timestamp=NOW, state=PendingLogState.CONFIRMED,
+            kb_heavy_kg_at_time=None, kb_swing_kg_at_time=12,
+            whoop_strain=15.0, whoop_workout_id="w2", matched_at=NOW,
+        )
+        async_db_session.add_all([log1, log2])
+        await async_db_session.flush()
+        async_db_session.add(Feedback(user_id=user.id, pending_log_id=log2.id, rpe_1_5=5))
+        await async_db_session.commit()
 
-        # Use sync query to verify aggregates logic
-        from sqlalchemy import func, select
+        result = await get_video_aggregates_by_profile(async_db_session, user.id, "test123456")
 
-        stmt = (
-            select(
-                PendingLog.kb_heavy_kg_at_time,
-                PendingLog.kb_swing_kg_at_time,
-                func.avg(PendingLog.whoop_strain),
-                func.count(),
-            )
-            .where(
-                PendingLog.user_id == user.id,
-                PendingLog.video_id == "test123456",
-                PendingLog.whoop_strain.isnot(None),
-                PendingLog.kb_heavy_kg_at_time.isnot(None),
-                PendingLog.kb_swing_kg_at_time.isnot(None),
-            )
-            .group_by(PendingLog.kb_heavy_kg_at_time, PendingLog.kb_swing_kg_at_time)
-            .order_by(func.count().desc())
+        # Only log1's profile is returned; log2 contributes neither strain nor RPE
+        (agg,) = result
+        assert (agg.heavy_kg, agg.swing_kg) == (20, 12)
+        assert (agg.avg_strain, agg.strain_count) == (10.0, 1)
+        assert (agg.avg_rpe, agg.rpe_count) == (None, 0)
+
+    async def test_profile_key_generated_column(
+        self, async_db_session: AsyncSession, seed: SimpleNamespace
+    ):
+        """kb_profile_key is computed by the database from the kb snapshot."""
+        user, now = seed.user, seed.now
+
+        log1 = PendingLog(
+            user_id=user.id,
+            equipment_profile_at_time=EquipmentProfile.HOME_FULL,
+            message_timestamp=now, state=PendingLogState.PENDING,
+            kb_heavy_kg_at_time=20, kb_swing_kg_at_time=12,
+        )
+        log2 = PendingLog(
+            user_id=user.id,
+            equipment_profile_at_time=EquipmentProfile.HOME_FULL,
+            message_timestamp=now, state=PendingLogState.PENDING,
+            kb_heavy_kg_at_time=None, kb_swing_kg_at_time=12,
         )
-        result = db_session.execute(stmt).all()
+        async_db_session.add_all([log1, log2])
+        await async_db_session.commit()
+        for log in (log1, log2):
+            await async_db_session.refresh(log, ["kb_profile_key"])
 
-        assert len(result) == 2
-        # H12-S12 has 2 entries (most frequent) - avg 9
-        profile_12_12 = [r for r in result if r[0] == 12 and r[1] == 12][0]
-        assert profile_12_12[2] == 9.0  # avg strain
-        assert profile_12_12[3] == 2    # count
-        # H20-S12 has 1 entry - avg 12
-        profile_20_12 = [r for r in result if r[0] == 20 and r[1] == 12][0]
-        assert profile_20_12[2] == 12.0
-        assert profile_20_12[3] == 1
+        assert log1.kb_profile_key == "H20-S12"
+        assert log2.kb_profile_key == profile_key(None, 12)
 
-    def test_effort_grouped_by_profile(self, db_session: Session):
-        """Effort (RPE) aggregates correctly grouped by KB profile."""
+    async def test_service_combines_strain_and_effort(self, async_db_session: AsyncSession):
+        """One grouped query returns strain and RPE per profile."""
         user = User(telegram_id=123)
-        db_session.add(user)
-        db_session.commit()
-
-        now = datetime.now(timezone.utc)
-        video = Video(video_id="test123456", usage_count=3, first_seen_at=now, last_used_at=now)
-        db_session.add(video)
-        db_session.commit()
+        now = NOW
+        async_db_session.add_all([
+            user,
+            Video(video_id="test123456", usage_count=3, first_seen_at=now, last_used_at=now),
+        ])
+        await async_db_session.flush()
 
-        # Create logs with linked feedback
         log1 = PendingLog(
             user_id=user.id, video_id="test123456",
             equipment_profile_at_time=EquipmentProfile.HOME_FULL,
             message_timestamp=now, state=PendingLogState.CONFIRMED,
-            kb_heavy_kg_at_time=12, kb_swing_kg_at_time=12,
-            whoop_workout_id="w1", matched_at=now,
+            kb_heavy_kg_at_time=12, kb_swing_kg_at_time=12, whoop_strain=8.0,
         )
         log2 = PendingLog(
             user_id=user.id, video_id="test123456",
             equipment_profile_at_time=EquipmentProfile.HOME_FULL,
             message_timestamp=now, state=PendingLogState.CONFIRMED,
             kb_heavy_kg_at_time=12, kb_swing_kg_at_time=12,
-            whoop_workout_id="w2", matched_at=now,
         )
         log3 = PendingLog(
             user_id=user.id, video_id="test123456",
             equipment_profile_at_time=EquipmentProfile.HOME_FULL,
             message_timestamp=now, state=PendingLogState.CONFIRMED,
-            kb_heavy_kg_at_time=20, kb_swing_kg_at_time=12,
-            whoop_workout_id="w3", matched_at=now,
+            kb_heavy_kg_at_time=20, kb_swing_kg_at_time=12, whoop_strain=12.0,
         )
-        db_session.add_all([log1, log2, log3])
-        db_session.commit()
+        # Neither strain nor RPE -> profile dropped by HAVING
+        log4 = PendingLog(
+            user_id=user.id, video_id="test123456",
+            equipment_profile_at_time=EquipmentProfile.HOME_FULL,
+            message_timestamp=now, state=PendingLogState.PENDING,
+            kb_heavy_kg_at_time=20, kb_swing_kg_at_time=20,
+        )
+        async_db_session.add_all([log1, log2, log3, log4])
+        await async_db_session.flush()
+        async_db_session.add(Feedback(user_id=user.id, pending_log_id=log2.id, rpe_1_5=3))
+        await async_db_session.commit()
 
-        # Add feedback linked to logs
-        fb1 = Feedback(user_id=user.id, pending_log_id=log1.id, rpe_1_5=3)
-        fb2 = Feedback(user_id=user.id, pending_log_id=log2.id, rpe_1_5=4)
-        fb3 = Feedback(user_id=user.id, pending_log_id=log3.id, rpe_1_5=2)
-        db_session.add_all([fb1, fb2, fb3])
-        db_session.commit()
+        result = await get_video_aggregates_by_profile(async_db_session, user.id, "test123456")
 
-        from sqlalchemy import func, select
+        assert [a.profile_key for a in result] == ["H12-S12", "H20-S12"]
+        h12, h20 = result
+        assert (h12.avg_strain, h12.strain_count, h12.avg_rpe, h12.rpe_count) == (8.0, 1, 3.0, 1)
+        assert (h20.avg_strain, h20.strain_count, h20.avg_rpe, h20.rpe_count) == (12.0, 1, None, 0)
 
-        stmt = (
-            select(
-                PendingLog.kb_heavy_kg_at_time,
-                PendingLog.kb_swing_kg_at_time,
-                func.avg(Feedback.rpe_1_5),
-                func.count(),
+    async def test_least_used_profile_not_dropped(self, async_db_session: AsyncSession):
+        """With many profiles, the newest (least used) one is still returned."""
+        user = User(telegram_id=123)
+        async_db_session.add_all([
+            user,
+            Video(video_id="test123456", usage_count=21, first_seen_at=NOW, last_used_at=NOW),
+        ])
+        await async_db_session.flush()
+
+        # Six heavy weights: 6 logs for the first, ... 1 log for the last
+        heavies = (12, 14, 16, 18, 20, 24)
+        async_db_session.add_all([
+            PendingLog(
+                user_id=user.id, video_id="test123456",
+                equipment_profile_at_time=EquipmentProfile.HOME_FULL,
+                message_timestamp=NOW, state=PendingLogState.CONFIRMED,
+                kb_heavy_kg_at_time=heavy, kb_swing_kg_at_time=12, whoop_strain=10.0,
             )
-            .join(Feedback, Feedback.pending_log_id == PendingLog.id)
-            .where(
-                PendingLog.user_id == user.id,
-                PendingLog.video_id == "test123456",
-                Feedback.rpe_1_5.isnot(None),
-                PendingLog.kb_heavy_kg_at_time.isnot(None),
-                PendingLog.kb_swing_kg_at_time.isnot(None),
+            for n, heavy in zip(range(6, 0, -1), heavies)
+            for _ in range(n)
+        ])
+        await async_db_session.commit()
+
+        result = await get_video_aggregates_by_profile(async_db_session, user.id, "test123456")
+        by_profile = {(a.heavy_kg, a.swing_kg): a for a in result}
+
+        assert len(result) == 6
+        assert by_profile[(24, 12)].strain_count == 1
+
+    async def test_repeat_feedback_does_not_duplicate_strain(
+        self, async_db_session: AsyncSession
+    ):
+        """Several RPE taps on one log count every RPE but the strain only once."""
+        user = User(telegram_id=123)
+        async_db_session.add_all([
+            user,
+            Video(video_id="test123456", usage_count=2, first_seen_at=NOW, last_used_at=NOW),
+        ])
+        await async_db_session.flush()
+
+        logs = [
+            PendingLog(
+                user_id=user.id, video_id="test123456",
+                equipment_profile_at_time=EquipmentProfile.HOME_FULL,
+                message_timestamp=NOW, state=PendingLogState.CONFIRMED,
+                kb_heavy_kg_at_time=20, kb_swing_kg_at_time=12, whoop_strain=strain,
             )
-            .group_by(PendingLog.kb_heavy_kg_at_time, PendingLog.kb_swing_kg_at_time)
-            .order_by(func.count().desc())
-        )
-        result = db_session.execute(stmt).all()
+            for strain in (10.0, 20.0)
+        ]
+        async_db_session.add_all(logs)
+        await async_db_session.flush()
+        # Two RPE taps on the first log (e.g. re-sent keyboard after /retry)
+        async_db_session.add_all([
+            Feedback(user_id=user.id, pending_log_id=logs[0].id, rpe_1_5=3),
+            Feedback(user_id=user.id, pending_log_id=logs[0].id, rpe_1_5=5),
+        ])
+        await async_db_session.commit()
 
-        assert len(result) == 2
-        # H12-S12: avg of 3 and 4 = 3.5
-        profile_12_12 = [r for r in result if r[0] == 12 and r[1] == 12][0]
-        assert profile_12_12[2] == 3.5
-        assert profile_12_12[3] == 2
-        # H20-S12: avg of 2 = 2.0
-        profile_20_12 = [r for r in result if r[0] == 20 and r[1] == 12][0]
-        assert profile_20_12[2] == 2.0
-        assert profile_20_12[3] == 1
+        (agg,) = await get_video_aggregates_by_profile(async_db_session, user.id, "test123456")
 
-    def test_excludes_null_profile_rows(self, db_session: Session):
-        """Rows with NULL kb weights are excluded from grouped aggregates."""
+        assert (agg.avg_strain, agg.strain_count) == (15.0, 2)
+        assert (agg.avg_rpe, agg.rpe_count) == (4.0, 2)
+
+
+class TestOverallAggregates:
+    """Tests for batched overall aggregates."""
+
+    async def test_batch_keyed_by_video(self, async_db_session: AsyncSession):
+        """One query returns per-video aggregates, zero counts for unused videos."""
         user = User(telegram_id=123)
-        db_session.add(user)
-        db_session.commit()
+        async_db_session.add(user)
+        await async_db_session.flush()
 
-        now = datetime.now(timezone.utc)
-        video = Video(video_id="test123456", usage_count=2, first_seen_at=now, last_used_at=now)
-        db_session.add(video)
-        db_session.commit()
+        now = NOW
+        for video_id in ("video1abcde", "video2fghij", "video3klmno"):
+            async_db_session.add(
+                Video(video_id=video_id, usage_count=1, first_seen_at=now, last_used_at=now)
+            )
+        await async_db_session.flush()
 
-        # Log with proper profile
         log1 = PendingLog(
-            user_id=user.id, video_id="test123456",
+            user_id=user.id, video_id="video1abcde",
             equipment_profile_at_time=EquipmentProfile.HOME_FULL,
             message_timestamp=now, state=PendingLogState.CONFIRMED,
-            kb_heavy_kg_at_time=20, kb_swing_kg_at_time=12,
-            whoop_strain=10.0, whoop_workout_id="w1", matched_at=now,
+            whoop_strain=8.0,
         )
-        # Log with NULL heavy_kg - should be excluded
         log2 = PendingLog(
-            user_id=user.id, video_id="test123456",
+            user_id=user.id, video_id="video1abcde",
             equipment_profile_at_time=EquipmentProfile.HOME_FULL,
             message_timestamp=now, state=PendingLogState.CONFIRMED,
-            kb_heavy_kg_at_time=None, kb_swing_kg_at_time=12,
-            whoop_strain=15.0, whoop_workout_id="w2", matched_at=now,
+            whoop_strain=10.0,
+        )
+        # No strain, but has RPE feedback
+        log3 = PendingLog(
+            user_id=user.id, video_id="video2fghij",
+            equipment_profile_at_time=EquipmentProfile.HOME_FULL,
+            message_timestamp=now, state=PendingLogState.CONFIRMED,
+        )
+        async_db_session.add_all([log1, log2, log3])
+        await async_db_session.flush()
+        async_db_session.add_all([
+            Feedback(user_id=user.id, pending_log_id=log1.id, rpe_1_5=4),
+            # Repeat RPE tap on log1: counts for RPE, not for strain
+            Feedback(user_id=user.id, pending_log_id=log1.id, rpe_1_5=2),
+            Feedback(user_id=user.id, pending_log_id=log3.id, rpe_1_5=2),
+        ])
+        await async_db_session.commit()
+
+        result = await get_videos_overall_aggregates(
+            async_db_session, user.id, ["video1abcde", "video2fghij", "video3klmno"]
         )
-        db_session.add_all([log1, log2])
-        db_session.commit()
 
-        from sqlalchemy import func, select
+        assert result["video1abcde"].avg_strain == 9.0
+        assert result["video1abcde"].strain_count == 2
+        assert result["video1abcde"].avg_rpe == 3.0
+        assert result["video1abcde"].rpe_count == 2
+        assert result["video2fghij"].strain_count == 0
+        assert result["video2fghij"].avg_rpe == 2.0
+        assert result["video2fghij"].rpe_count == 1
+        assert result["video3klmno"].strain_count == 0
+        assert result["video3klmno"].rpe_count == 0
 
-        stmt = (
-            select(func.count())
-            .where(
-                PendingLog.user_id == user.id,
-                PendingLog.video_id == "test123456",
-                PendingLog.whoop_strain.isnot(None),
-                PendingLog.kb_heavy_kg_at_time.isnot(None),
-                PendingLog.kb_swing_kg_at_time.isnot(None),
-            )
-        )
-        result = db_session.execute(stmt).scalar()
 
-        # Only 1 row should match (log1), log2 is excluded
-        assert result == 1
+class TestCreateLogWithVideo:
+    """Tests for fused video upsert + log insert."""
+
+    async def test_upserts_usage_and_inserts_logs(self, async_db_session: AsyncSession):
+        """First call creates the video, second bumps usage; each adds a log."""
+        user = User(telegram_id=123)
+        async_db_session.add(user)
+        await async_db_session.flush()
+
+        now = NOW
+        logs = [
+            await create_log_with_video(
+                async_db_session, "video1abcde",
+                user_id=user.id,
+                equipment_profile_at_time=EquipmentProfile.HOME_FULL,
+                message_timestamp=now, state=PendingLogState.PENDING,
+            )
+            for _ in range(2)
+        ]
+        await async_db_session.commit()
+
+        video = await async_db_session.get(Video, "video1abcde")
+        await async_db_session.refresh(video)
+        assert video.usage_count == 2
+        assert logs[0].id != logs[1].id
+        assert all(log.video_id == "video1abcde" for log in logs)
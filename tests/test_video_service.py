@@ -1,31 +1,25 @@
-"""Tests for video service: upsert, usage tracking, last used queries."""
+"""Tests for video rows and the last-used video query."""
 
 import pytest
 from datetime import datetime, timezone, timedelta
-from uuid import uuid4
 
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from whoop_coach.db.models import Base, PendingLog, PendingLogState, User, Video, EquipmentProfile
+from whoop_coach.db.models import PendingLog, PendingLogState, User, Video, EquipmentProfile
+from whoop_coach.videos.service import get_last_used_video
 
-
-@pytest.fixture
-def db_session():
-    """Create an in-memory SQLite database for testing."""
-    engine = create_engine("sqlite:///:memory:")
-    Base.metadata.create_all(engine)
-    with Session(engine) as session:
-        yield session
+# Fixed timestamp: these tests never depend on wall-clock time
+NOW = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
 
 
-class TestUpsertVideo:
-    """Tests for video upsert functionality."""
+class TestVideoRows:
+    """Tests for Video row writes (creation, tag toggles)."""
 
     def test_video_upsert_creates_new(self, db_session: Session):
         """New video created with usage_count=1."""
         video_id = "abc12345678"
-        now = datetime.now(timezone.utc)
+        now = NOW
         
         # Create new video
         video = Video(
@@ -47,7 +41,7 @@ class TestUpsertVideo:
     def test_video_upsert_increments_usage(self, db_session: Session):
         """Existing video gets usage_count+1, last_used_at updated."""
         video_id = "abc12345678"
-        first_time = datetime.now(timezone.utc) - timedelta(days=1)
+        first_time = NOW - timedelta(days=1)
         
         # Create initial video
         video = Video(
@@ -61,7 +55,7 @@ class TestUpsertVideo:
         
         # Simulate upsert (increment usage)
         video = db_session.get(Video, video_id)
-        second_time = datetime.now(timezone.utc)
+        second_time = NOW
         video.usage_count += 1
         video.last_used_at = second_time
         db_session.commit()
@@ -74,71 +68,63 @@ class TestUpsertVideo:
         assert result.last_used_at >= second_time.replace(tzinfo=None)  # updated
 
 
+@pytest.fixture
+def make_log(db_session: Session):
+    """Factory: insert a user + video and return a PendingLog linked to both."""
+    def _make(**over) -> PendingLog:
+        user = User(telegram_id=over.pop("telegram_id", 123456789))
+        video = Video(
+            video_id=over.pop("video_id", "test1234567"),
+            usage_count=1,
+            first_seen_at=NOW,
+            last_used_at=NOW,
+        )
+        db_session.add_all([user, video])
+        db_session.flush()
+
+        fields = {
+            "equipment_profile_at_time": EquipmentProfile.HOME_FULL,
+            "state": PendingLogState.PENDING,
+            "message_timestamp": NOW,
+            **over,
+        }
+        log = PendingLog(user_id=user.id, video_id=video.video_id, **fields)
+        db_session.add(log)
+        db_session.flush()
+        return log
+
+    return _make
+
+
 class TestPendingLogVideoFK:
     """Tests for PendingLog → Video FK relationship."""
 
-    def test_pendinglog_links_video_fk(self, db_session: Session):
+    def test_pendinglog_links_video_fk(self, db_session: Session, make_log):
         """PendingLog.video_id FK works correctly."""
-        # Create user
-        user = User(telegram_id=123456789)
-        db_session.add(user)
-        db_session.commit()
-        
-        # Create video
-        video_id = "xyz98765432"
-        now = datetime.now(timezone.utc)
-        video = Video(
-            video_id=video_id,
-            usage_count=1,
-            first_seen_at=now,
-            last_used_at=now,
-        )
-        db_session.add(video)
-        db_session.commit()
-        
-        # Create pending log linked to video
-        pending_log = PendingLog(
-            user_id=user.id,
-            video_id=video_id,
-            equipment_profile_at_time=EquipmentProfile.HOME_FULL,
-            message_timestamp=now,
-            state=PendingLogState.PENDING,
-        )
-        db_session.add(pending_log)
+        pending_log = make_log(video_id="xyz98765432")
         db_session.commit()
         
         # Verify
         result = db_session.get(PendingLog, pending_log.id)
-        assert result.video_id == video_id
+        assert result.video_id == "xyz98765432"
+        assert db_session.get(Video, result.video_id) is not None
 
 
 class TestKbUsedSnapshot:
     """Tests for KB used snapshot updates."""
 
-    def test_kb_used_updates_snapshot_heavy(self, db_session: Session):
+    # Default snapshot shared by every log in this class (H20-S12)
+    BASE_LOG_KWARGS = dict(
+        equipment_profile_at_time=EquipmentProfile.HOME_FULL,
+        state=PendingLogState.PENDING,
+        kb_heavy_kg_at_time=20,
+        kb_swing_kg_at_time=12,
+    )
+
+    def test_kb_used_updates_snapshot_heavy(self, db_session: Session, make_log):
         """kb_heavy_kg_at_time is updated correctly."""
-        # Create user and video
-        user = User(telegram_id=123456789)
-        db_session.add(user)
-        db_session.commit()
-        
-        video_id = "test1234567"
-        now = datetime.now(timezone.utc)
-        video = Video(video_id=video_id, usage_count=1, first_seen_at=now, last_used_at=now)
-        db_session.add(video)
-        db_session.commit()
-        
-        # Create pending log with default snapshot
-        pending_log = PendingLog(
-            user_id=user.id,
-            video_id=video_id,
-            equipment_profile_at_time=EquipmentProfile.HOME_FULL,
-            message_timestamp=now,
-            state=PendingLogState.PENDING,
-            kb_heavy_kg_at_time=20,  # default
-            kb_swing_kg_at_time=12,  # default
-        )
-        db_session.add(pending_log)
+        # Pending log with default snapshot
+        pending_log = make_log(**self.BASE_LOG_KWARGS)
         db_session.commit()
         
         # Update heavy weight
@@ -151,28 +137,9 @@ class TestKbUsedSnapshot:
         assert result.kb_heavy_kg_at_time == 12
         assert result.kb_swing_kg_at_time == 12  # unchanged
 
-    def test_kb_used_updates_snapshot_swing(self, db_session: Session):
+    def test_kb_used_updates_snapshot_swing(self, db_session: Session, make_log):
         """kb_swing_kg_at_time is updated correctly."""
-        user = User(telegram_id=123456789)
-        db_session.add(user)
-        db_session.commit()
-        
-        video_id = "test1234567"
-        now = datetime.now(timezone.utc)
-        video = Video(video_id=video_id, usage_count=1, first_seen_at=now, last_used_at=now)
-        db_session.add(video)
-        db_session.commit()
-        
-        pending_log = PendingLog(
-            user_id=user.id,
-            video_id=video_id,
-            equipment_profile_at_time=EquipmentProfile.HOME_FULL,
-            message_timestamp=now,
-            state=PendingLogState.PENDING,
-            kb_heavy_kg_at_time=20,
-            kb_swing_kg_at_time=12,
-        )
-        db_session.add(pending_log)
+        pending_log = make_log(**self.BASE_LOG_KWARGS)
         db_session.commit()
         
         # Update swing weight
@@ -185,37 +152,20 @@ class TestKbUsedSnapshot:
         assert result.kb_swing_kg_at_time == 20
         assert result.kb_heavy_kg_at_time == 20  # unchanged
 
-    def test_kb_used_keep_resets_to_user_defaults(self, db_session: Session):
+    def test_kb_used_keep_resets_to_user_defaults(self, db_session: Session, make_log):
         """Keep action resets snapshot to user defaults."""
-        user = User(telegram_id=123456789, kb_heavy_kg=20, kb_swing_kg=12)
-        db_session.add(user)
-        db_session.commit()
-        
-        video_id = "test1234567"
-        now = datetime.now(timezone.utc)
-        video = Video(video_id=video_id, usage_count=1, first_seen_at=now, last_used_at=now)
-        db_session.add(video)
-        db_session.commit()
-        
-        # Create log with different values
-        pending_log = PendingLog(
-            user_id=user.id,
-            video_id=video_id,
-            equipment_profile_at_time=EquipmentProfile.HOME_FULL,
-            message_timestamp=now,
-            state=PendingLogState.PENDING,
-            kb_heavy_kg_at_time=12,  # different from default
-            kb_swing_kg_at_time=20,  # different from default
+        # Log with values different from the user defaults (20/12)
+        pending_log = make_log(
+            **{**self.BASE_LOG_KWARGS, "kb_heavy_kg_at_time": 12, "kb_swing_kg_at_time": 20}
         )
-        db_session.add(pending_log)
         db_session.commit()
         
         # Simulate keep action
         pending_log = db_session.get(PendingLog, pending_log.id)
-        user = db_session.get(User, user.id)
+        user = db_session.get(User, pending_log.user_id)
         pending_log.kb_heavy_kg_at_time = user.kb_heavy_kg
         pending_log.kb_swing_kg_at_time = user.kb_swing_kg
-        pending_log.kb_used_answered_at = now
+        pending_log.kb_used_answered_at = NOW
         db_session.commit()
         
         # Verify reset to defaults
@@ -224,28 +174,9 @@ class TestKbUsedSnapshot:
         assert result.kb_swing_kg_at_time == 12
         assert result.kb_used_answered_at is not None
 
-    def test_kb_used_skip_finalizes_without_change(self, db_session: Session):
+    def test_kb_used_skip_finalizes_without_change(self, db_session: Session, make_log):
         """Skip sets answered_at only, no weight changes."""
-        user = User(telegram_id=123456789)
-        db_session.add(user)
-        db_session.commit()
-        
-        video_id = "test1234567"
-        now = datetime.now(timezone.utc)
-        video = Video(video_id=video_id, usage_count=1, first_seen_at=now, last_used_at=now)
-        db_session.add(video)
-        db_session.commit()
-        
-        pending_log = PendingLog(
-            user_id=user.id,
-            video_id=video_id,
-            equipment_profile_at_time=EquipmentProfile.HOME_FULL,
-            message_timestamp=now,
-            state=PendingLogState.PENDING,
-            kb_heavy_kg_at_time=20,
-            kb_swing_kg_at_time=12,
-        )
-        db_session.add(pending_log)
+        pending_log = make_log(**self.BASE_LOG_KWARGS)
         db_session.commit()
         
         orig_heavy = pending_log.kb_heavy_kg_at_time
@@ -253,7 +184,7 @@ class TestKbUsedSnapshot:
         
         # Simulate skip action
         pending_log = db_session.get(PendingLog, pending_log.id)
-        pending_log.kb_used_answered_at = now
+        pending_log.kb_used_answered_at = NOW
         db_session.commit()
         
         # Verify no changes except answered_at
@@ -269,7 +200,7 @@ class TestTagging:
     def test_tag_toggle_add_remove(self, db_session: Session):
         """Toggle adds/removes from movement_tags."""
         video_id = "tag_test123"
-        now = datetime.now(timezone.utc)
+        now = NOW
         
         video = Video(
             video_id=video_id,
@@ -300,20 +231,23 @@ class TestTagging:
         result = db_session.get(Video, video_id)
         assert "swing" not in result.movement_tags
 
-    def test_tag_last_selects_most_recent_video(self, db_session: Session):
-        """get_last_used_video returns video from most recent pending_log."""
-        # Create user
+    async def test_tag_last_selects_most_recent_video(self, async_db_session: AsyncSession):
+        """get_last_used_video returns (video_id, tags) from the most recent pending_log."""
+        session = async_db_session
         user = User(telegram_id=123456789)
-        db_session.add(user)
-        db_session.commit()
+        session.add(user)
+        await session.flush()
         
-        now = datetime.now(timezone.utc)
+        now = NOW
         
         # Create two videos
-        video1 = Video(video_id="video1abcde", usage_count=1, first_seen_at=now, last_used_at=now)
+        video1 = Video(
+            video_id="video1abcde", usage_count=1, first_seen_at=now, last_used_at=now,
+            movement_tags=["swing"],
+        )
         video2 = Video(video_id="video2fghij", usage_count=1, first_seen_at=now, last_used_at=now)
-        db_session.add_all([video1, video2])
-        db_session.commit()
+        session.add_all([video1, video2])
+        await session.flush()
         
         # Create pending logs: video1 first, then video2
         log1 = PendingLog(
@@ -322,6 +256,7 @@ class TestTagging:
             equipment_profile_at_time=EquipmentProfile.HOME_FULL,
             message_timestamp=now - timedelta(hours=1),
             state=PendingLogState.PENDING,
+            created_at=now - timedelta(hours=1),
         )
         log2 = PendingLog(
             user_id=user.id,
@@ -329,22 +264,19 @@ class TestTagging:
             equipment_profile_at_time=EquipmentProfile.HOME_FULL,
             message_timestamp=now,
             state=PendingLogState.PENDING,
+            created_at=now,
         )
-        db_session.add_all([log1, log2])
-        db_session.commit()
+        session.add_all([log1, log2])
+        await session.commit()
         
-        # Query: should return video2 (most recent by pending_log.created_at)
-        from sqlalchemy import select
-        stmt = (
-            select(Video)
-            .join(PendingLog, PendingLog.video_id == Video.video_id)
-            .where(
-                PendingLog.user_id == user.id,
-                PendingLog.video_id.isnot(None),
-            )
-            .order_by(PendingLog.created_at.desc())
-            .limit(1)
-        )
-        result = db_session.execute(stmt).scalar_one_or_none()
-        assert result is not None
-        assert result.video_id == "video2fghij"
+        # Most recent by pending_log.created_at, projected as a plain tuple
+        result = await get_last_used_video(session, user.id)
+        assert result == ("video2fghij", [])
+
+    async def test_last_used_video_none_without_logs(self, async_db_session: AsyncSession):
+        """get_last_used_video returns None when the user has no video logs."""
+        user = User(telegram_id=987654321)
+        async_db_session.add(user)
+        await async_db_session.commit()
+        
+        assert await get_last_used_video(async_db_session, user.id) is None
@@ -2,72 +2,82 @@
 
 import pytest
 
-from whoop_coach.youtube import parse_youtube_url
+from whoop_coach.youtube import parse_youtube_url, parse_youtube_urls
 
 
 class TestParseYoutubeUrl:
     """Test suite for parse_youtube_url function."""
 
-    def test_parse_standard_url(self):
-        """Standard youtube.com/watch URLs."""
-        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://m.youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://youtu.be/dQw4w9WgXcQ",
+            "https://youtube.com/shorts/dQw4w9WgXcQ",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=120",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLrAXtmErZgOeiKm4sgNOknGvNjby9efdf",
+            "https://youtube.com/embed/dQw4w9WgXcQ",
+            "https://www.youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+        ],
+        ids=[
+            "standard", "no_www", "mobile", "short", "shorts",
+            "timestamp", "playlist", "embed", "v_after_other_params",
+        ],
+    )
+    def test_parse_valid_url(self, url):
+        """Every supported URL shape yields the 11-char video ID."""
         assert parse_youtube_url(url) == "dQw4w9WgXcQ"
 
-    def test_parse_standard_url_no_www(self):
-        """Without www prefix."""
-        url = "https://youtube.com/watch?v=dQw4w9WgXcQ"
-        assert parse_youtube_url(url) == "dQw4w9WgXcQ"
-
-    def test_parse_mobile_url(self):
-        """Mobile m.youtube.com URLs."""
-        url = "https://m.youtube.com/watch?v=dQw4w9WgXcQ"
-        assert parse_youtube_url(url) == "dQw4w9WgXcQ"
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQX",
+            "https://vimeo.com/123456",
+            "https://www.youtube.com/watch",
+            "not a url at all",
+            "",
+        ],
+        ids=["id_too_long", "wrong_domain", "no_video_id", "malformed", "empty"],
+    )
+    def test_parse_invalid_url(self, url):
+        """Non-YouTube or malformed input returns None."""
+        assert parse_youtube_url(url) is None
 
-    def test_parse_short_url(self):
-        """Short youtu.be URLs."""
-        url = "https://youtu.be/dQw4w9WgXcQ"
+    def test_parse_bytes_url(self):
+        """Bytes input is parsed without decoding; ID comes back as str."""
+        url = b"https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=120"
         assert parse_youtube_url(url) == "dQw4w9WgXcQ"
+        assert parse_youtube_url(b"https://vimeo.com/123456") is None
 
-    def test_parse_shorts_url(self):
-        """YouTube Shorts URLs."""
-        url = "https://youtube.com/shorts/dQw4w9WgXcQ"
+    def test_idempotent_cached(self):
+        """Repeated and whitespace-padded links hit the same cached parse."""
+        url = "https://youtu.be/dQw4w9WgXcQ?t=5"
         assert parse_youtube_url(url) == "dQw4w9WgXcQ"
-
-    def test_parse_url_with_timestamp(self):
-        """URL with timestamp parameter."""
-        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=120"
         assert parse_youtube_url(url) == "dQw4w9WgXcQ"
+        assert parse_youtube_url(f"  {url}\n") == "dQw4w9WgXcQ"
 
-    def test_parse_url_with_playlist(self):
-        """URL with playlist parameter."""
-        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLrAXtmErZgOeiKm4sgNOknGvNjby9efdf"
-        assert parse_youtube_url(url) == "dQw4w9WgXcQ"
+    def test_chat_words_bypass_cache(self):
+        """Non-YouTube words are rejected before the LRU cache and never fill it."""
+        parse_youtube_url.cache_clear()
+        url = "https://youtu.be/dQw4w9WgXcQ"
+        parse_youtube_url(url)
+        for i in range(2000):
+            assert parse_youtube_url(f"word{i}") is None
 
-    def test_parse_embed_url(self):
-        """Embed URL format."""
-        url = "https://youtube.com/embed/dQw4w9WgXcQ"
+        assert parse_youtube_url.cache_info().currsize == 1
         assert parse_youtube_url(url) == "dQw4w9WgXcQ"
-
-    def test_parse_invalid_url_wrong_domain(self):
-        """Non-YouTube domain returns None."""
-        url = "https://vimeo.com/123456"
-        assert parse_youtube_url(url) is None
-
-    def test_parse_invalid_url_no_video_id(self):
-        """YouTube URL without video ID."""
-        url = "https://www.youtube.com/watch"
-        assert parse_youtube_url(url) is None
-
-    def test_parse_invalid_url_malformed(self):
-        """Malformed URL."""
-        url = "not a url at all"
-        assert parse_youtube_url(url) is None
-
-    def test_parse_empty_string(self):
-        """Empty string returns None."""
-        assert parse_youtube_url("") is None
-
-    def test_parse_none_input(self):
-        """None-like input."""
-        # Note: function expects str, but should handle edge cases
-        assert parse_youtube_url("") is None
+        assert parse_youtube_url.cache_info().hits == 1
+
+    def test_parse_batch(self):
+        """Batch API matches the scalar parser item by item."""
+        urls = [
+            "https://youtu.be/dQw4w9WgXcQ",
+            "not a url at all",
+            "",
+            b"https://youtube.com/shorts/dQw4w9WgXcQ",
+            " https://www.youtube.com/watch?feature=share&v=dQw4w9WgXcQ ",
+        ]
+        assert parse_youtube_urls(urls) == ["dQw4w9WgXcQ", None, None, "dQw4w9WgXcQ", "dQw4w9WgXcQ"]
+        assert parse_youtube_urls(urls) == [parse_youtube_url(u) for u in urls]